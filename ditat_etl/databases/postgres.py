@@ -1,13 +1,20 @@
+import io
+import re
 import json
-import traceback
+import time
 from functools import wraps
+from uuid import uuid4
+from contextlib import contextmanager
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
 from ast import literal_eval
 import warnings
 
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2 import errors, sql
+from psycopg2.extras import RealDictCursor, execute_values, execute_batch
+from psycopg2.pool import ThreadedConnectionPool
 import pandas as pd
-import numpy as np
 
 from ..time import TimeIt
 
@@ -15,6 +22,87 @@ from ..time import TimeIt
 warnings.filterwarnings('ignore')
 
 
+def retry_on(*exceptions, max_attempts=3, backoff=0.05):
+	'''
+	Decorator to call the function again when one of exceptions is raised,
+	waiting backoff * 2 ** attempt seconds in between.
+	The last failure is raised.
+	'''
+	def decorator(function):
+		@wraps(function)
+		def wrapper(*args, **kwargs):
+			for attempt in range(max_attempts):
+				try:
+					return function(*args, **kwargs)
+
+				except exceptions:
+					if attempt == max_attempts - 1:
+						raise
+
+					time.sleep(backoff * 2 ** attempt)
+		return wrapper
+	return decorator
+
+
+# astype(str) renderings of missing values.
+NULL_STRINGS = ['nan', 'None', '<NA>', '']
+
+
+def parse_literal(x):
+	'''
+	list/dict from its string form. json.loads (C parser) first, since
+	values usually come from JSON APIs; Python literals (single quotes,
+	True/None) fall back to literal_eval.
+	'''
+	try:
+		return json.loads(x)
+
+	except ValueError:
+		return literal_eval(x)
+
+
+def to_json(x):
+	'''
+	json.dumps for list/dict values and their string literals.
+	Missing values are returned as None.
+	'''
+	if type(x) in [list, dict]:
+		pass
+
+	elif pd.isnull(x) or x in ['null', 'None']:
+		return None
+
+	else:
+		x = parse_literal(x)
+
+	return json.dumps(x)
+
+
+def nulls_to_none(df):
+	'''
+	Missing values as None, which psycopg2 sends as NULL. Done column by
+	column and only where a column has nulls, instead of a frame-wide
+	where(); columns are made object first so floats can hold None.
+	'''
+	for col in df.columns:
+		mask = df[col].isna()
+
+		if mask.any():
+			df[col] = df[col].astype(object).where(~mask, None)
+
+	return df
+
+
+class PreparingConnection(psycopg2.extensions.connection):
+	'''
+	psycopg2 connection that keeps track of the statements PREPAREd on it,
+	since prepared statements live as long as the session.
+	'''
+	def __init__(self, *args, **kwargs):
+		super().__init__(*args, **kwargs)
+		self.prepared = set()
+
+
 class Postgres:
 	TYPES_MAPPING = {
 		'text': str,
@@ -68,7 +156,24 @@ class Postgres:
 		'location': 'jsonb',
 	}
 
-	def __init__(self, config, keep_connection_alive=False, schema='public'):
+	# Seconds self.tables is served from cache.
+	TABLES_CACHE_TTL = 60
+
+	# A single 'VALUES %s' (not followed by more placeholders): execute_values form.
+	VALUES_PLACEHOLDER = re.compile(r'VALUES\s+%s(?!\s*,)', re.IGNORECASE)
+
+	# Values per execute_values statement, so wide frames get fewer rows per
+	# page. Same bound as Postgres' bind parameters per statement.
+	MAX_VALUES_PER_STATEMENT = 65535
+
+	def __init__(
+		self,
+		config,
+		keep_connection_alive=False,
+		schema='public',
+		pool_minconn=1,
+		pool_maxconn=8,
+	):
 		'''
 		Args:
 			config (dict): Client configuration
@@ -81,28 +186,142 @@ class Postgres:
 			}
 
 			keep_connection_alive (bool, default):
-				Persist the connection as an attribute of the class or create
-				and close the connection with each call. Similar to a context
-				manager.
+				Persist the connection as an attribute of the class or
+				borrow a connection from the pool with each call. Similar
+				to a context manager.
+
+			pool_minconn (int, default=1): Connections opened when the pool
+				is created (lazily, on the first query).
+
+			pool_maxconn (int, default=8): Maximum number of pooled connections.
 
 		'''
 		self.config = config
 		self._schema = schema
 		self.keep_connection_alive = keep_connection_alive
 
+		self.pool_minconn = pool_minconn
+		self.pool_maxconn = pool_maxconn
+		self._pool = None
+		self.conn = None
+
+		# information_schema lookups, keyed by (schema, tablename) / schema
+		self._info_cache = {}
+		self._cols_cache = {}
+		self._tables_cache = {}
+		self._known_tables = {}
+
+		# insert_df_to_sql ON CONFLICT clauses, keyed by
+		# (schema, tablename, conflict_on, do_update_columns)
+		self._conflict_cache = {}
+
 		if self.keep_connection_alive is True:
 			self.connect()
 
 	def connect(self):
 		'''
 		Only triggered when self.keep_connection_alive == True.
+		The connection is taken from self.pool and held until self.close().
 		'''
 		# config = ' '.join([f"{k}={v}" for k, v in self.config.items()])
 		# self.conn = psycopg2.connect(config)
-		self.conn = psycopg2.connect(**self.config)
+		if self.conn is not None:
+			self.pool.putconn(self.conn, close=bool(self.conn.closed))
+
+		self.conn = self.pool.getconn()
+
+	def close(self):
+		'''
+		Close the held connection (if any) and every pooled connection.
+		The pool is recreated on the next query.
+		'''
+		if self._pool is not None:
+			self._pool.closeall()
+			self._pool = None
+
+		self.conn = None
 
 	def close_conn(self):
-		self.conn.close()
+		'''
+		Kept for backwards compatibility, see self.close().
+		'''
+		self.close()
+
+	@property
+	def pool(self):
+		'''
+		Connection pool. With self.keep_connection_alive one of its
+		connections is held as self.conn, otherwise one is borrowed per call.
+		Created on first access so instantiating the class stays cheap.
+		'''
+		if self._pool is None:
+			self._pool = ThreadedConnectionPool(
+				self.pool_minconn,
+				self.pool_maxconn,
+				connection_factory=PreparingConnection,
+				**self.config
+			)
+		return self._pool
+
+	@contextmanager
+	def _connection(self, commit=True):
+		'''
+		Yields the persisted connection or one borrowed from the pool.
+		Pooled connections are rolled back and reset before being returned,
+		so no transaction or autocommit state leaks to the next caller.
+		Connections that are closed or cannot be reset are discarded.
+		'''
+		if self.keep_connection_alive is True:
+			if self.conn is None or self.conn.closed:
+				self.connect()
+
+			self.conn.autocommit = commit
+			yield self.conn
+			return
+
+		conn = self.pool.getconn()
+
+		try:
+			conn.autocommit = commit
+			yield conn
+
+		finally:
+			discard = bool(conn.closed)
+
+			if not discard:
+				try:
+					conn.rollback()
+					conn.autocommit = False
+
+				except psycopg2.Error:
+					discard = True
+
+			self.pool.putconn(conn, close=discard)
+
+	@staticmethod
+	@contextmanager
+	def _transaction(conn, commit=True):
+		'''
+		Runs the block in a single transaction committed once at the end,
+		even if conn is in autocommit, and rolled back on error. With
+		commit False the block stays in the caller's transaction.
+		'''
+		if not (commit and conn.autocommit):
+			yield
+			return
+
+		conn.autocommit = False
+
+		try:
+			yield
+			conn.commit()
+
+		except Exception:
+			conn.rollback()
+			raise
+
+		finally:
+			conn.autocommit = True
 
 	def table_exists(function):
 		'''
@@ -110,13 +329,42 @@ class Postgres:
 		'''
 		@wraps(function)
 		def wrapper(self, tablename, *args, **kwargs):
-			if tablename not in self.tables:
-				print(f'Table {tablename} does not exist for {self._schema} schema!')
-				return None
+			known_tables = self._known_tables.setdefault(self._schema, set())
+
+			if tablename not in known_tables:
+				if not self._table_exists_probe(tablename):
+					print(f'Table {tablename} does not exist for {self._schema} schema!')
+					return None
+
+				known_tables.add(tablename)
+
 			result = function(self, tablename, *args, **kwargs)
 			return result
 		return wrapper
 
+	def _table_exists_probe(self, tablename):
+		'''
+		Reads the table's information_schema.columns rows and keeps them for
+		self.get_table_info, so a cold lookup costs one round trip instead of
+		a probe followed by the metadata query.
+		Tables without columns fall back to a single-row catalog lookup.
+		'''
+		info = self._fetch_table_info(tablename)
+
+		if len(info):
+			self._info_cache[(self._schema, tablename)] = info
+			return True
+
+		query = 'SELECT 1 FROM information_schema.tables WHERE table_schema = %s AND table_name = %s LIMIT 1;'
+		result = self.query(
+			query_statement=query,
+			commit=False,
+			mogrify=True,
+			mogrify_tuple=(self._schema, tablename),
+			prepare_as='ditat_table_exists'
+		)
+		return bool(result)
+
 	@property
 	def schema(self):
 		return self._schema
@@ -125,6 +373,30 @@ class Postgres:
 	def schema(self, value):
 		self._schema = value
 
+	def clear_cache(self, tablename=None):
+		'''
+		Drops cached information_schema lookups for the current schema.
+		Caches are filled by self.tables, self.get_table_info,
+		self.get_table_cols and the @table_exists decorator.
+
+		Args:
+			- tablename (str, default=None): Only drop the entry of this table.
+				The list of tables is always dropped.
+		'''
+		self._tables_cache.pop(self._schema, None)
+
+		prefix = (self._schema,) if tablename is None else (self._schema, tablename)
+
+		for cache in (self._info_cache, self._cols_cache, self._conflict_cache):
+			for key in [k for k in cache if k[:len(prefix)] == prefix]:
+				del cache[key]
+
+		if tablename is not None:
+			self._known_tables.get(self._schema, set()).discard(tablename)
+
+		else:
+			self._known_tables.pop(self._schema, None)
+
 	# @TimeIt()
 	def query(
 		self,
@@ -137,14 +409,21 @@ class Postgres:
 		mogrify_tuple: tuple or list=None,
 		verbose=False,
 		timeout=1200,
+		bulk: bool=False,
+		page_size: int=1000,
+		template: str=None,
+		prepare_as: str=None,
+		chunksize: int=None,
+		batch: bool=False,
+		combine: bool=False,
 	):
 		'''
 		Low level method for querying.
 
 		Notes:
 			- If self.keep_connection_alive is False,
-				this method will create and destroy the connection each time.
-				If it is True, it will persist the connection.
+				this method will borrow a connection from self.pool and give
+				it back afterwards. If it is True, it will persist the connection.
 
 		Args:
 			- query_statement (str or list): A query or list of queries.
@@ -168,82 +447,456 @@ class Postgres:
 
 			- timeout (int, default=600): Timeout in seconds.
 
+			- bulk (bool, default=False): query_statement has a single
+				'VALUES %s' placeholder and mogrify_tuple is an iterable of rows.
+				Rows are sent with psycopg2.extras.execute_values in pages
+				instead of being mogrified into one statement.
+				Set automatically when mogrify is True and a single statement
+				with 'VALUES %s' is given a list of rows.
+
+			- page_size (int, default=1000): Rows per page when bulk is True.
+				All pages of a statement run in one transaction, committed
+				once after the last page.
+
+			- template (str, default=None): Row template for execute_values,
+				e.g. '(%s, %s)'. Built once and reused for every row.
+
+			- prepare_as (str, default=None): Name of a server-side prepared
+				statement for a single query_statement. It is PREPAREd the
+				first time a connection sees it and EXECUTEd afterwards,
+				skipping parse and planning. Placeholders must be plain %s.
+
+			- chunksize (int, default=None): Fetch the result through a
+				server-side cursor, chunksize rows at a time, instead of in a
+				single client-side buffer. A DataFrame is still built once
+				from all rows, with the same dtypes as without chunksize.
+				Not used together with prepare_as.
+
+			- batch (bool, default=False): query_statement is a single
+				statement and mogrify_tuple a list of parameter tuples, one per
+				execution. Sent with psycopg2.extras.execute_batch, page_size
+				executions per round trip. Returns the status of the last page.
+
+			- combine (bool, default=False): Send the statements of a list
+				whose results are not fetched in a single execute (one round
+				trip) instead of one by one. Postgres runs a multi-statement
+				execute as one implicit transaction: one failing statement
+				rolls back the others, and statements that cannot run in a
+				transaction block (VACUUM, CREATE INDEX CONCURRENTLY, ...) fail.
+
 		Returns
 			- results (list or pd.DataFrame or dict): Depending on the df
 				parameter and also the parameter.
 				If given more than one query, it will only return the result
 				of the last one. Order of queries is important.
+
+		Raises:
+			- psycopg2.Error: Database errors are not caught.
 		'''
-		conn = psycopg2.connect(
-			**self.config,
-			# options=f'-c statement_timeout={timeout}000'
-			# options="-c search_path=dbo,public"
-		) if not self.keep_connection_alive else self.conn
+		if mogrify and not bulk and isinstance(query_statement, str) \
+			and isinstance(mogrify_tuple, list) \
+			and self.VALUES_PLACEHOLDER.search(query_statement):
+			bulk = True
 
-		conn.autocommit = True if commit else False
-	
-		try:
+		with self._connection(commit=commit) as conn:
 			query_statement_lst = query_statement \
 				if isinstance(query_statement, list) else [query_statement]
-					
+
+			# One parameter set per statement only when both are lists,
+			# otherwise the same parameters go with every statement.
 			mogrify_tuple_list = mogrify_tuple \
-				if isinstance(query_statement, list) else [mogrify_tuple]
+				if isinstance(query_statement, list) and isinstance(mogrify_tuple, list) \
+				else [mogrify_tuple] * len(query_statement_lst)
 
-			cursor = conn.cursor(cursor_factory=RealDictCursor) if as_dict else conn.cursor()  
-			
-			for index, query_statement in enumerate(query_statement_lst):
+			last_idx = len(query_statement_lst) - 1
 
-				if mogrify:
-					query_statement = cursor.mogrify(
-						query_statement,
-						mogrify_tuple_list[index]
-					)
+			encoding = psycopg2.extensions.encodings[conn.encoding]
 
-				if verbose:
-					print(query_statement)
+			with conn.cursor(cursor_factory=RealDictCursor if as_dict else None) as cursor:
+				# With combine, statements whose results are not needed are
+				# sent together in a single execute instead of one by one.
+				pending = []
+
+				def flush_pending():
+					cursor.execute(';\n'.join(pending))
+					pending.clear()
+					return cursor.statusmessage
+
+				for index, query_statement in enumerate(query_statement_lst):
+
+					if prepare_as:
+						query_statement = self._prepare(cursor, prepare_as, query_statement)
+
+					if mogrify and not (bulk or batch):
+						query_statement = cursor.mogrify(
+							query_statement,
+							mogrify_tuple_list[index]
+						).decode(encoding)
+
+					if verbose:
+						print(query_statement)
+
+					fetch_last = returning and index == last_idx
+
+					if pending and (bulk or batch or fetch_last):
+						flush_pending()
+
+					if bulk:
+						# Pages commit together, like the single statement they
+						# replace: a failing page leaves nothing behind.
+						with self._transaction(conn, commit=commit):
+							results = self._execute_values(
+								cursor,
+								query_statement,
+								mogrify_tuple_list[index],
+								template=template,
+								page_size=page_size,
+								fetch=fetch_last
+							)
+
+						if fetch_last and as_dict:
+							results = [dict(i) for i in results]
+
+					elif batch:
+						execute_batch(
+							cursor,
+							query_statement,
+							mogrify_tuple_list[index],
+							page_size=page_size
+						)
+						results = cursor.statusmessage
+
+					elif fetch_last and chunksize and not prepare_as:
+						results = self._read_chunked(conn, query_statement, chunksize, df=df, as_dict=as_dict)
+
+					elif fetch_last:
+						# Fetching only the last query
+						cursor.execute(query_statement)
+
+						if df:
+							# coerce_float as pd.read_sql did: numeric columns
+							# come back as float64, not Decimal objects.
+							results = pd.DataFrame.from_records(
+								cursor.fetchall(),
+								columns=[d.name for d in cursor.description],
+								coerce_float=True
+							)
+
+						else:
+							results = cursor.fetchall()
+
+							if as_dict:
+								results = [dict(i) for i in results]
+					elif combine:
+						pending.append(query_statement)
 
-				if returning and index == (len(query_statement_lst) - 1):
-					# Fetching only the last query
-					if df:
-						results = pd.read_sql(query_statement, conn)
-					
 					else:
 						cursor.execute(query_statement)
-						results = cursor.fetchall()
+						results = cursor.statusmessage
 
-						if as_dict:
-							results = [dict(i) for i in results]
-				else:
-					cursor.execute(query_statement)
-					results = cursor.statusmessage
+				if pending:
+					results = flush_pending()
 
-			cursor.close()
 			return results
-		
-		except Exception as e:
-			# print(e)
-			print(traceback.format_exc())
+
+	def query_parallel(self, query_statements, max_workers=None, **kwargs):
+		'''
+		Run independent statements concurrently, each on its own pooled
+		connection and transaction. Threads spend their time waiting on
+		the server, so this scales up to pool_maxconn.
+
+		Args:
+			- query_statements (list): Statements, each passed to self.query.
+			- max_workers (int, default=None): Defaults to pool_maxconn.
+			- **kwargs: Forwarded to self.query (df, as_dict, commit, ...).
+
+		Returns:
+			- list: One result per statement, in the same order.
+		'''
+		# A single persisted connection can only run one statement at a time.
+		if self.keep_connection_alive is True:
+			return [self.query(i, **kwargs) for i in query_statements]
+
+		max_workers = min(max_workers or self.pool_maxconn, self.pool_maxconn)
+
+		with ThreadPoolExecutor(max_workers=max_workers) as executor:
+			results = executor.map(lambda i: self.query(i, **kwargs), query_statements)
+
+		return [*results]
+
+	@staticmethod
+	def _read_chunked(conn, query_statement, chunksize, df=True, as_dict=False):
+		'''
+		Read the result from a named (server-side) cursor, chunksize rows
+		at a time. Named cursors only exist inside a transaction, so
+		autocommit is switched off for the read and restored afterwards.
+
+		With df, the frame is built once from all the rows, so column dtypes
+		are the same as without chunksize, wherever the chunks split.
+
+		Returns:
+			- pd.DataFrame if df, else a list of tuples (dicts if as_dict).
+		'''
+		autocommit = conn.autocommit
+		conn.autocommit = False
+
+		try:
+			with conn.cursor(
+				name=f'ditat_{uuid4().hex}',
+				cursor_factory=RealDictCursor if as_dict and not df else None
+			) as cursor:
+				cursor.itersize = chunksize
+				cursor.execute(query_statement)
+
+				chunks = []
+
+				for rows in iter(lambda: cursor.fetchmany(chunksize), []):
+					if as_dict and not df:
+						chunks.extend(dict(i) for i in rows)
+					else:
+						chunks.extend(rows)
+
+				# description is only filled in after the first fetch
+				columns = [d.name for d in cursor.description]
+
+			if autocommit:
+				conn.commit()
+
+		except Exception:
+			conn.rollback()
+			raise
 
 		finally:
-			if self.keep_connection_alive is False:
-				conn.close()		
+			conn.autocommit = autocommit
+
+		if not df:
+			return chunks
+
+		return pd.DataFrame.from_records(chunks, columns=columns, coerce_float=True)
+
+	@staticmethod
+	def _prepare(cursor, name, query_statement):
+		'''
+		PREPAREs query_statement as name on the cursor's connection if it
+		has not been done yet.
+
+		Returns:
+			- 'EXECUTE name (%s, ...)' with as many placeholders as query_statement.
+		'''
+		n_params = query_statement.count('%s')
+
+		if name not in cursor.connection.prepared:
+			counter = iter(range(1, n_params + 1))
+
+			cursor.execute('PREPARE {} AS {}'.format(
+				name,
+				re.sub('%s', lambda m: f'${next(counter)}', query_statement.rstrip().rstrip(';'))
+			))
+			cursor.connection.prepared.add(name)
+
+		if n_params == 0:
+			return f'EXECUTE {name}'
+
+		return f"EXECUTE {name} ({', '.join(['%s'] * n_params)})"
+
+	@staticmethod
+	def _execute_values(
+		cursor,
+		query_statement,
+		values,
+		template=None,
+		page_size=1000,
+		fetch=False
+	):
+		'''
+		Calls execute_values one page at a time so the returned status
+		message (or fetched rows) accounts for every page, not only the last one.
+
+		Args:
+			- cursor (psycopg2 cursor)
+
+			- query_statement (str): Statement with a single 'VALUES %s'.
+
+			- values (iterable): Rows (tuples). Can be a generator.
+
+			- template (str, default=None): Row template, see execute_values.
+
+			- page_size (int, default=1000)
+
+			- fetch (bool, default=False): Return the rows of every page.
+
+		Returns:
+			- status (str): e.g. 'INSERT 0 {N_RECORDS}' or rows (list) if fetch.
+		'''
+		values = iter(values)
+		rowcount = 0
+		status = None
+		rows = []
+
+		while True:
+			page = list(islice(values, page_size))
+
+			if not page:
+				break
+
+			execute_values(
+				cursor,
+				query_statement,
+				page,
+				template=template,
+				page_size=page_size
+			)
+
+			rowcount += cursor.rowcount
+			status = cursor.statusmessage
+
+			if fetch:
+				rows.extend(cursor.fetchall())
+
+		if fetch:
+			return rows
+
+		if status is None:
+			return None
+
+		return ' '.join(status.split()[:-1] + [str(rowcount)])
+
+	@staticmethod
+	def _csv_buffer(df, conn):
+		'''
+		CSV for COPY ... WITH (FORMAT CSV, NULL '\\N'), encoded up front in the
+		connection's encoding so copy_expert sends the bytes as they are.
+		'''
+		buffer = io.BytesIO()
+		df.to_csv(
+			buffer,
+			index=False,
+			header=False,
+			na_rep='\\N',
+			encoding=psycopg2.extensions.encodings[conn.encoding]
+		)
+		buffer.seek(0)
+		return buffer
+
+	@classmethod
+	def _page_size(cls, page_size, n_columns):
+		'''
+		page_size capped at MAX_VALUES_PER_STATEMENT values per statement.
+		'''
+		return max(1, min(page_size, cls.MAX_VALUES_PER_STATEMENT // max(n_columns, 1)))
+
+	def _copy_df_to_sql(self, df, tablename, commit=True, verbose=False, conflict_clause=None):
+		'''
+		Insert through COPY FROM STDIN, which skips the SQL parser and
+		per-row planning.
+
+		COPY has no ON CONFLICT, so when conflict_clause is given the frame
+		is copied into a temporary staging table (same column types, no
+		constraints) and moved over with a single INSERT ... SELECT.
+
+		Args:
+			- df (pd.DataFrame): Already coerced to the table's types.
+			- tablename (str): Target table.
+			- commit (bool, default=True)
+			- verbose (bool, default=False)
+			- conflict_clause (str, default=None): e.g. 'ON CONFLICT (id) DO NOTHING'
+
+		Returns:
+			- 'INSERT 0 {N_RECORDS}'
+		'''
+		keys = ', '.join(df.columns)
+		target = f'{self.schema}.{tablename}'
+		staging = f'tmp_upsert_{uuid4().hex}' if conflict_clause else None
+
+		copy_query = "COPY {} ({}) FROM STDIN WITH (FORMAT CSV, NULL '\\N')".format(
+			staging or target,
+			keys
+		)
+
+		# The staging table is dropped on commit, so it needs a transaction.
+		with self._connection(commit=commit and staging is None) as conn:
+			buffer = self._csv_buffer(df, conn)
+			cursor = conn.cursor()
+
+			if staging:
+				create_query = f'CREATE TEMP TABLE {staging} ON COMMIT DROP AS SELECT {keys} FROM {target} WITH NO DATA'
+				if verbose:
+					print(create_query)
+				cursor.execute(create_query)
+
+			if verbose:
+				print(copy_query)
+			cursor.copy_expert(copy_query, buffer)
+
+			if staging:
+				insert_query = f'INSERT INTO {target} ({keys}) SELECT {keys} FROM {staging} {conflict_clause}'
+				if verbose:
+					print(insert_query)
+				cursor.execute(insert_query)
+
+				if commit:
+					conn.commit()
+
+			result = f'INSERT 0 {cursor.rowcount}'
+			cursor.close()
+			return result
+
+	def _query_staged(self, df, staging, query_statement, commit=True, verbose=False):
+		'''
+		COPY df into a temporary text table named staging (dropped on commit)
+		and run query_statement, which reads from it, in the same transaction.
+
+		Returns:
+			- list: Rows returned by query_statement.
+		'''
+		create_query = 'CREATE TEMP TABLE {} ({}) ON COMMIT DROP'.format(
+			staging,
+			', '.join(f'{col} TEXT' for col in df.columns)
+		)
+		copy_query = "COPY {} FROM STDIN WITH (FORMAT CSV, NULL '\\N')".format(staging)
+
+		with self._connection(commit=False) as conn:
+			with conn.cursor() as cursor:
+				if verbose:
+					print(create_query, copy_query, query_statement, sep='\n')
+
+				cursor.execute(create_query)
+				cursor.copy_expert(copy_query, self._csv_buffer(df, conn))
+				cursor.execute(query_statement)
+				results = cursor.fetchall()
+
+			if commit:
+				conn.commit()
+
+			return results
 
 	@property
 	def tables(self):
 		'''
 		Returns list of tables for the current schema.
-		Value changes if given another schema
+		Value changes if given another schema.
+
+		Cached for self.TABLES_CACHE_TTL seconds.
 		'''
+		cached = self._tables_cache.get(self.schema)
+
+		if cached is not None and time.monotonic() - cached[0] < self.TABLES_CACHE_TTL:
+			return list(cached[1])
+
 		query = 'SELECT table_name FROM information_schema.tables WHERE table_schema = %s;'
 		result = self.query(
 			query_statement=query,
 			commit=False,
 			mogrify=True,
-			mogrify_tuple=(self.schema,)
+			mogrify_tuple=(self.schema,),
+			prepare_as='ditat_tables'
 		)
 		result = [i[0] for i in result]
 		result.sort()
-		return result
+
+		self._tables_cache[self.schema] = (time.monotonic(), result)
+
+		return list(result)
 
 	@property
 	def views(self):
@@ -266,19 +919,30 @@ class Postgres:
 		Notes:
 			- Assuming the schema given. Would have to set schema to a different value if needed.
 
+			- Cached per (schema, tablename), see self.clear_cache.
+
 		Returns:
 			result (list): List of column names for tablename
 		'''
+		key = (self.schema, tablename)
+
+		if key not in self._info_cache:
+			self._info_cache[key] = self._fetch_table_info(tablename)
+
+		# Callers modify the returned frame.
+		return self._info_cache[key].copy()
+
+	def _fetch_table_info(self, tablename):
 		query = 'SELECT * FROM information_schema.columns WHERE table_schema = %s AND table_name = %s;'
 
-		result = self.query(
+		return self.query(
 			query_statement=query,
 			df=True,
 			commit=False,
 			mogrify=True,
-			mogrify_tuple=(self.schema, tablename)
+			mogrify_tuple=(self.schema, tablename),
+			prepare_as='ditat_table_info'
 		)
-		return result
 
 	@table_exists
 	def get_table_cols(self, tablename, sort=False):
@@ -288,14 +952,33 @@ class Postgres:
 		Notes:
 			- Assuming the schema given. Would have to set schema to a different value if needed.
 
+			- Cached per (schema, tablename), see self.clear_cache.
+
 		Returns:
 			- result (list): List of column names for tablename
 		'''
-		table_info = self.get_table_info(tablename)
-		columns = table_info.column_name
+		key = (self.schema, tablename)
+
+		if key not in self._cols_cache and key in self._info_cache:
+			info = self._info_cache[key]
+			self._cols_cache[key] = info.sort_values('ordinal_position')['column_name'].tolist()
+
+		if key not in self._cols_cache:
+			query = 'SELECT column_name FROM information_schema.columns WHERE table_schema = %s AND table_name = %s ORDER BY ordinal_position;'
+
+			result = self.query(
+				query_statement=query,
+				commit=False,
+				mogrify=True,
+				mogrify_tuple=(self.schema, tablename),
+				prepare_as='ditat_table_cols'
+			)
+			self._cols_cache[key] = [r[0] for r in result]
+
+		columns = list(self._cols_cache[key])
 		if sort:
-			columns = columns.sort_values()
-		return columns.tolist()
+			columns.sort()
+		return columns
 
 	@table_exists
 	def get_table_data_types(self, tablename, df=False, sql_types=False):
@@ -309,23 +992,37 @@ class Postgres:
 		Returns:
 			result (dict)			
 		'''
-		table_info = self.get_table_info(tablename)
+		result = self._get_table_types_raw(tablename)
 
 		if sql_types is False:
 
-			table_info['data_type'] = table_info['data_type'].map(type(self).TYPES_MAPPING) 
+			result = {k: type(self).TYPES_MAPPING.get(v) for k, v in result.items()}
 
-		result = table_info[['column_name', 'data_type']]
+		if df is True:
 
-		if df is False:
-
-			result = [
-				value for index, value in result.set_index('column_name').to_dict().items()
-			][0]
+			result = pd.DataFrame({
+				'column_name': list(result.keys()),
+				'data_type': list(result.values())
+			})
 
 		return result 
 
-	@TimeIt()
+	def _get_table_types_raw(self, tablename):
+		'''
+		{column_name: sql data_type}, read straight from the cached
+		information_schema rows without copying them.
+		'''
+		key = (self.schema, tablename)
+
+		if key not in self._info_cache:
+			self._info_cache[key] = self._fetch_table_info(tablename)
+
+		info = self._info_cache[key]
+
+		return dict(zip(info['column_name'], info['data_type']))
+
+	@TimeIt(verbose_arg='verbose')
+	@retry_on(errors.SerializationFailure, errors.DeadlockDetected)
 	def insert_df_to_sql(
 		self,
 		df: pd.DataFrame,
@@ -333,7 +1030,9 @@ class Postgres:
 		commit=True,
 		conflict_on: str or list=None,
 		do_update_columns: bool or list=False,
-		verbose=False
+		verbose=False,
+		page_size=1000,
+		copy_threshold=5000
 	):
 		'''
 		Replacement for pd.to_sql() since it drops and inserts the whole table.
@@ -358,6 +1057,15 @@ class Postgres:
 
 			- verbose (bool, default=False): Print query.
 
+			- page_size (int, default=1000): Rows per INSERT statement when
+				rows are sent with execute_values.
+
+			- copy_threshold (int, default=5000): Frames longer than this are
+				COPYed, into a staging table and upserted from there when
+				conflict_on is given. Shorter ones go through execute_values,
+				which needs fewer round trips and adapts values as psycopg2
+				literals, more lenient than COPY's CSV input.
+
 		Returns:
 
 			- 'INSERT 0 {N_RECORDS}'
@@ -376,62 +1084,90 @@ class Postgres:
 
 			if data_type == list:
 				try:
-					df[col] = df[col].apply(literal_eval)
+					df[col] = df[col].map(lambda x: parse_literal(x) if isinstance(x, str) else x)
 				except:
 					pass
 
 			elif data_type == dict:
 
 				try:
-					df[col] = df[col].apply(literal_eval).apply(json.dumps)
+					df[col] = df[col].map(to_json)
 				except:
 					# review this change, Portuguese and weird encodings
 					pass
 
 			elif data_type in [int, float]:
 				# Workaround: Cannot place None with numerical.
-				df[col] = df[col].astype(str)
-				df[col] = df[col].replace({'nan': None})
-				df[col] = df[col].str.replace(',', '')
-				df[col] = df[col].replace({'': None})
-
-				### under evaluation
-				df[col] = df[col].replace({'None': None})
+				df[col] = df[col].astype(str).str.replace(',', '', regex=False)
 
 				if data_type == int:
-					df[col] = df[col].apply(lambda x: x.split('.')[0] if x is not None else x)
+					df[col] = df[col].str.split('.', n=1).str[0]
+
+				### under evaluation ('None')
+				df[col] = df[col].where(~df[col].isin(NULL_STRINGS), None)
 
 			elif data_type == str:
 				if df[col].dtype != 'object':
-					df[col] = df[col].astype(str)
-					df = df.replace({'nan': None})
+					df[col] = df[col].astype(str).where(df[col].notna(), None)
 
-		df = df.where(pd.notnull(df), None)
 		######
 
-		df_dict = df.to_dict(orient='records')
-		keys = ', '.join(df_dict[0].keys())
-		values = [tuple(i.values()) for i in df_dict]
+		keys = ', '.join(df.columns)
+		conflict_clause = ''
+
+		conflict_on = conflict_on if isinstance(conflict_on, list) or not conflict_on else [conflict_on]
 
-		query = '''INSERT INTO {}.{} ({}) VALUES '''.format(self.schema, tablename, keys)
-		query += ', '.join(["%s"] * len(values))
+		# Same conflict target against the same table: reuse the clause.
+		cache_key = (
+			self.schema,
+			tablename,
+			tuple(conflict_on or ()),
+			tuple(do_update_columns) if isinstance(do_update_columns, list) else do_update_columns
+		)
 
-		if conflict_on:
+		if cache_key in self._conflict_cache:
+			conflict_clause = self._conflict_cache[cache_key]
 
-			conflict_on = conflict_on if isinstance(conflict_on, list) else [conflict_on]
+		elif conflict_on:
 
 			if do_update_columns is False:
-				query += f" ON CONFLICT ({', '.join(conflict_on)}) DO NOTHING"
+				conflict_clause += f"ON CONFLICT ({', '.join(conflict_on)}) DO NOTHING"
 
 			else:
-				query += f" ON CONFLICT ({', '.join(conflict_on)}) DO UPDATE SET "
+				conflict_clause += f"ON CONFLICT ({', '.join(conflict_on)}) DO UPDATE SET "
 
 				table_columns = do_update_columns if isinstance(do_update_columns, list) else self.get_table_cols(tablename)
 				# add checker of columns in table
-				table_columns = list(set(table_columns) - set(conflict_on))
+				# Table order is kept so the statement text is stable between calls.
+				conflict_set = set(conflict_on)
+				table_columns = (i for i in table_columns if i not in conflict_set)
+
+				conflict_clause += ', '.join(f"{i} = EXCLUDED.{i}" for i in table_columns)
+
+		self._conflict_cache[cache_key] = conflict_clause
+
+		# COPY is the fastest way in, but CSV has no array literal.
+		if list not in filtered_data_types.values() and len(df) > copy_threshold:
+			result = self._copy_df_to_sql(
+				df=df,
+				tablename=tablename,
+				commit=commit,
+				verbose=verbose,
+				conflict_clause=conflict_clause or None
+			)
+			if verbose:
+				print(result)
+
+			return result
+
+		# One C-level conversion, with NaN/NaT as None (COPY writes them as \N
+		# itself). Rows are still handed to execute_values one page at a time.
+		values = map(tuple, df.to_numpy(dtype=object, na_value=None))
 
-				table_columns = ', '.join([f"{i} = EXCLUDED.{i}" for i in table_columns])
-				query += table_columns
+		query = '''INSERT INTO {}.{} ({}) VALUES %s'''.format(self.schema, tablename, keys)
+
+		if conflict_clause:
+			query += f' {conflict_clause}'
 
 		query += ";"
 
@@ -441,16 +1177,19 @@ class Postgres:
 			as_dict=False,
 			commit=commit,
 			returning=False,
-			mogrify=True,
 			mogrify_tuple=values,
-			verbose=verbose
+			verbose=verbose,
+			bulk=True,
+			template=f"({', '.join(['%s'] * len(df.columns))})",
+			page_size=self._page_size(page_size, len(df.columns))
 		)
 		if verbose:
 			print(result)
 
 		return result
 
-	@TimeIt()
+	@TimeIt(verbose_arg='verbose')
+	@retry_on(errors.SerializationFailure, errors.DeadlockDetected)
 	def update_df_to_sql(
 		self,
 		df: pd.DataFrame,
@@ -459,7 +1198,9 @@ class Postgres:
 		insert_new=True,
 		commit=True,
 		verbose=False,
-		overwrite=False
+		overwrite=False,
+		page_size=1000,
+		copy_threshold=5000
 		):
 		'''
 		This implementation is slightly different from
@@ -488,63 +1229,67 @@ class Postgres:
 			- overwrite (bool, default=False): If False, values will only be updated if
 				existing evaluate to NULL.
 
+			- page_size (int, default=1000): Rows per statement sent with
+				execute_values.
+
+			- copy_threshold (int, default=5000): Frames longer than this are
+				COPYed into a temporary table that the statement reads from,
+				instead of being sent as VALUES pages.
+
+		Notes:
+			- Either way the whole update (and insert) is one transaction,
+				committed once at the end when commit is True.
+
 		Returns:
 			- {'update': 'UPDATE {N_RECORDS}'} or {'update': 'UPDATE {N_RECORDS}', 'INSERT 0 {N_RECORDS}'}
 		'''
-		df = df.copy()
-		df.columns = [i.lower() for i in df.columns]
-
-		table_data_types = self.get_table_data_types(tablename)
+		# Lower-cased name -> name in df. Only the columns used below are
+		# copied out of df, further down.
+		df_columns = {i.lower(): i for i in df.columns}
+
+		# One metadata lookup for both the sql types and their python mapping.
+		sql_data_types = self.get_table_data_types(tablename, sql_types=True)
+		table_data_types = {
+			i: type(self).TYPES_MAPPING.get(j) for i, j in sql_data_types.items()
+		}
 		# following line used for coalesce and casting
 		table_raw_data_types = {
-			i: (j if j not in ['ARRAY'] else 'varchar[]') for i, j in self.get_table_data_types(tablename, sql_types=True).items()
+			i: (j if j not in ['ARRAY'] else 'varchar[]') for i, j in sql_data_types.items()
 		}
-		table_columns = list(table_data_types.keys())
+		table_columns = set(table_data_types)
 
 		# for col in df.columns:
 		# 	if col not in table_columns:
 		# 		raise ValueError(f'{col} does not exist in the table {tablename}.')
 		
 		on_columns = on_columns if isinstance(on_columns, list) else [on_columns]
-		updated_columns = [col for col in df.columns if col in table_columns if col not in on_columns]
+		skip_columns = set(on_columns)
+		updated_columns = [col for col in df_columns if col in table_columns and col not in skip_columns]
 
-		df = df[on_columns + updated_columns]
+		df = df[[df_columns[col] for col in on_columns + updated_columns]]
+		df.columns = on_columns + updated_columns
 
 		# Data formatting
 		filtered_data_types = {k: j for k, j in table_data_types.items() if k in df.columns}
 
-		def f(x):
-			if type(x) in [list, dict]:
-				pass
-
-			elif x in [np.nan, 'null', None, 'None']:
-				return None
-
-			else:
-				x = literal_eval(x)
-
-			return json.dumps(x)
-
 		for col in df.columns:
 			data_type = filtered_data_types[col]
 
 			if data_type in [list, dict]:
-				df[col] = df[col].apply(f)
+				df[col] = df[col].map(to_json)
 
 			elif data_type in [int, float]:
 				# Workaround: Cannot place None with numerical.
-				df[col] = df[col].replace({None: np.nan})
-				df[col] = df[col].replace({'': np.nan})
 				df[col] = df[col].astype(str)
-				df[col] = df[col].replace({'nan': None})
 
 				if data_type == int:
-					df[col] = df[col].apply(lambda x: x.split('.')[0] if x is not None else x)
+					df[col] = df[col].str.split('.', n=1).str[0]
+
+				df[col] = df[col].where(~df[col].isin(NULL_STRINGS), None)
 
 			elif data_type == str:
 				if df[col].dtype != 'object':
-					df[col] = df[col].astype(str)
-					df = df.replace({'nan': None})
+					df[col] = df[col].astype(str).where(df[col].notna(), None)
 
 			elif data_type == 'datetime64':
 				df[col] = pd.to_datetime(df[col])
@@ -556,11 +1301,10 @@ class Postgres:
 			# 	df[col] = df[col].astype(str)
 			# 	df[col] = df[col].replace({'True': 'true', 'False': 'false'})
 
-		df = df.where(pd.notnull(df), None)
+		df = nulls_to_none(df)
 		###
 
-		records = df.to_dict(orient='records')
-		records = [tuple(value.values()) for value in records]
+		staging = f'tmp_update_{uuid4().hex}' if len(df) > copy_threshold else None
 
 		if overwrite:
 			initial_source = 'df'
@@ -569,75 +1313,93 @@ class Postgres:
 			initial_source = 'target'
 			secondary_source = 'df'
 
-		query = '''UPDATE {}.{} as target SET {} FROM (VALUES {}) AS df({}) WHERE {};'''.format(
+		values_template = f"({', '.join(['%s'] * len(df.columns))})"
+
+		join_condition = ' AND '.join([f"df.{col}::TEXT = target.{col}::TEXT" for col in on_columns])
+
+		# Staged rows are text like the VALUES literals, the casts below apply to both.
+		if staging:
+			df_source = f"df AS (SELECT {', '.join(df.columns)} FROM {staging})"
+		else:
+			df_source = f"df({', '.join(df.columns)}) AS (VALUES %s)"
+
+		# UPDATE and INSERT share the staged VALUES in a single statement:
+		# one round trip per page and no window between both steps. Every
+		# page runs in one transaction committed once (query's bulk path,
+		# or _query_staged), so a failure applies nothing.
+		query = '''WITH {}, upd AS (UPDATE {}.{} as target SET {} FROM df WHERE {} RETURNING 1)'''.format(
+			df_source,
+
 			self.schema,
 			tablename,
 
 			', '.join([f"{col} = COALESCE({initial_source}.{col}::{data_type}, {secondary_source}.{col}::{data_type})" for col, \
 				data_type in table_raw_data_types.items() if col in updated_columns]),
 
-			', '.join(["%s"] * len(records)),
-
-			', '.join(df.columns.tolist()),
-
-			' AND '.join([f"df.{col}::TEXT = target.{col}::TEXT" for col in on_columns])
-		)
-		results = {}
-
-		result = self.query(
-			query_statement=query,
-			df=False,
-			as_dict=False,
-			commit=commit,
-			returning=False,
-			mogrify=True,
-			mogrify_tuple=records,
-			verbose=verbose
+			join_condition
 		)
-		results['update'] = result
 
 		if insert_new:
-			on_columns_fmt = ', '.join(on_columns)
+			# Anti-join done by Postgres: only rows whose on_columns are not
+			# in the table yet are inserted, nothing is pulled to the client.
+			query += ''', ins AS (INSERT INTO {}.{} ({}) SELECT {} FROM df WHERE NOT EXISTS (SELECT 1 FROM {}.{} AS target WHERE {}) RETURNING 1)'''.format(
+				self.schema,
+				tablename,
+
+				', '.join(df.columns.tolist()),
+
+				', '.join([f"df.{col}::{table_raw_data_types[col]}" for col in df.columns]),
 
-			existing_query = 'SELECT {} FROM {}.{}'.format(
-				on_columns_fmt,
 				self.schema,
-				tablename
-			)
-			existing_df = self.query(
-				query_statement=existing_query,
-				df=True
+				tablename,
+
+				join_condition
 			)
-			
-			existing_df[on_columns] = existing_df[on_columns].astype(str)
-
-			new_df = pd.merge(
-				left=df,
-				right=existing_df,
-				how='left',
-				on=on_columns,
-				suffixes=('', '_y'),
-				indicator=True
+			query += ' SELECT (SELECT COUNT(*) FROM upd), (SELECT COUNT(*) FROM ins);'
+
+		else:
+			query += ' SELECT (SELECT COUNT(*) FROM upd), 0;'
+
+		if staging:
+			counts = self._query_staged(df, staging, query, commit=commit, verbose=verbose)
+
+		else:
+			counts = self.query(
+				query_statement=query,
+				df=False,
+				as_dict=False,
+				commit=commit,
+				returning=True,
+				mogrify_tuple=df.itertuples(index=False, name=None),
+				verbose=verbose,
+				bulk=True,
+				template=values_template,
+				page_size=self._page_size(page_size, len(df.columns))
 			)
-			new_df = new_df[new_df['_merge'] == 'left_only']
-			new_df = new_df[on_columns + updated_columns]
-
-			if new_df.shape[0] > 0:
-				result = self.insert_df_to_sql(
-					df=new_df,
-					tablename=tablename,
-					commit=commit,
-					conflict_on=None,
-					do_update_columns=False,
-					verbose=False
-				)
-				results['insert'] = result
-			else:
-				results['insert'] = 'INSERT 0 0'
+
+		results = {'update': f"UPDATE {sum(c[0] for c in counts)}"}
+
+		if insert_new:
+			results['insert'] = f"INSERT 0 {sum(c[1] for c in counts)}"
 
 		print(results)
 		return results
 
+	@staticmethod
+	def _identifier(name):
+		'''
+		Quoted identifier. Names are lower-cased the way Postgres folds
+		unquoted ones, so they still match the unquoted SQL built elsewhere.
+		'''
+		return sql.Identifier(name.lower())
+
+	def _as_string(self, statement):
+		'''
+		Render a psycopg2.sql composable; quoting depends on the connection.
+		'''
+		with self._connection() as conn:
+			return statement.as_string(conn)
+
 	def create_table(
 		self,
 		tablename,
@@ -661,26 +1423,22 @@ class Postgres:
 
 			- commit(bool, default=True)
 		'''
-		query = 'CREATE TABLE '
-
-		if if_not_exists:
-			query += 'IF NOT EXISTS '
-
-		query += f"{self.schema}.{tablename} "
-
 		columns = []
 
 		for column in column_mappings:
-			s = f"{column['name']} {column['type']}"
-			
+			s = sql.SQL('{} {}').format(self._identifier(column['name']), sql.SQL(column['type']))
+
 			if primary_key and column['name'] == primary_key:
-				s += ' PRIMARY KEY'
+				s += sql.SQL(' PRIMARY KEY')
 			columns.append(s)
 
-		columns_fmt = '(' + ', '.join(columns) + ')'
-
-		query += columns_fmt
-		query += ';'
+		query = sql.SQL('CREATE TABLE {if_not_exists}{schema}.{tablename} ({columns});').format(
+			if_not_exists=sql.SQL('IF NOT EXISTS ' if if_not_exists else ''),
+			schema=self._identifier(self.schema),
+			tablename=self._identifier(tablename),
+			columns=sql.SQL(', ').join(columns)
+		)
+		query = self._as_string(query)
 
 		self.query(
 			query_statement=query,
@@ -688,6 +1446,7 @@ class Postgres:
 			returning=False,
 			verbose=True
 		)
+		self.clear_cache(tablename)
 
 	def create_table_index(
 		self,
@@ -702,19 +1461,20 @@ class Postgres:
 		'''
 		columns = columns if isinstance(columns, list) else [columns]
 		
-		table_columns = self.get_table_cols(tablename)
-
-		if not all(elem in table_columns  for elem in columns):
-			raise AssertionError(f"One or more columns provided don't exist in table {tablename}.")
-
-		columns_fmt = ', '.join(columns)
-
-		query = "CREATE"
-
-		if unique:
-			query += ' UNIQUE'
-
-		query += f' INDEX IF NOT EXISTS {index_name} ON {self.schema}.{tablename} USING {method}({columns_fmt});'
+		missing = set(columns) - set(self.get_table_cols(tablename))
+
+		if missing:
+			raise AssertionError(f"Columns {sorted(missing)} don't exist in table {tablename}.")
+
+		query = sql.SQL('CREATE {unique}INDEX IF NOT EXISTS {index_name} ON {schema}.{tablename} USING {method}({columns});').format(
+			unique=sql.SQL('UNIQUE ' if unique else ''),
+			index_name=self._identifier(index_name),
+			schema=self._identifier(self.schema),
+			tablename=self._identifier(tablename),
+			method=sql.SQL(method),
+			columns=sql.SQL(', ').join(self._identifier(i) for i in columns)
+		)
+		query = self._as_string(query)
 
 		self.query(
 			query_statement=query,
@@ -722,6 +1482,7 @@ class Postgres:
 			verbose=True,
 			returning=False
 		)
+		self.clear_cache(tablename)
 
 	def add_columns(
 		self,
@@ -741,3 +1502,4 @@ class Postgres:
 			commit=commit,
 			verbose=verbose
 		)
+		self.clear_cache(tablename)
@@ -1,8 +1,12 @@
 import json
+import time
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from typing import Union, Dict
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
 import numpy as np
 
@@ -83,51 +87,165 @@ class Hubspot:
 
 	DEFAULT_DATE_WINDOW = 0.1
 
-	def __init__(self, api_key):
+	# The search API stops paging after this many results.
+	MAX_SEARCH_RESULTS = 10_000
+
+	# Seconds a /properties response is served from cache.
+	OBJECT_INFO_CACHE_TTL = 3600
+
+	# Seconds the /owners listing is served from cache.
+	OWNERS_CACHE_TTL = 3600
+
+	def __init__(self, api_key, max_workers=4):
 		'''
 		Args:
 
 			- api_key (str): Hubspot API key
+
+			- max_workers (int, default=4): Concurrent requests when paginating.
+				Keep it low, the search API is rate limited per account.
 		'''
 		self.api_key = api_key
+		self.max_workers = max_workers
+
+		# One keep-alive connection pool for every call, instead of a new
+		# TLS connection per request. 429s and 5xx errors are retried
+		# with backoff (Retry-After is honored), idempotent methods only:
+		# a POST that creates records is not replayed.
+		self.session = self._new_session(
+			max_workers,
+			Retry.DEFAULT_ALLOWED_METHODS,
+		)
+
+		# Search and batch/read are POSTs that only read, safe to retry.
+		self.read_session = self._new_session(
+			max_workers,
+			Retry.DEFAULT_ALLOWED_METHODS | {'POST'},
+		)
 
-	def get_object_info(self, object_type, return_as_df=True):
+		# /properties results keyed by object_type: (time.monotonic(), results)
+		self._object_info_cache = {}
+
+		# /owners results: (time.monotonic(), results)
+		self._owners_cache = None
+
+	def _new_session(self, max_workers, allowed_methods):
 		'''
+		Authenticated session retrying allowed_methods on 429 and 5xx.
+		'''
+		session = requests.Session()
+		session.headers.update({
+			'Authorization': f'Bearer {self.api_key}',
+			'Content-Type': 'application/json',
+		})
+
+		retries = Retry(
+			total=5,
+			backoff_factor=0.2,
+			status_forcelist=[429, 500, 502, 503, 504],
+			allowed_methods=allowed_methods,
+			raise_on_status=False,
+		)
+		adapter = HTTPAdapter(
+			pool_connections=10,
+			pool_maxsize=max(10, max_workers),
+			max_retries=retries,
+		)
+		session.mount('https://', adapter)
+
+		return session
+
+	def clear_cache(self, object_type=None):
+		'''
+		Drops cached /properties and /owners results, see
+		self.get_object_info_raw and self.get_owners.
+
+		Args:
+
+			- object_type (str, default=None): Only drop this object type.
+				Use 'owners' for the owners listing.
+		'''
+		if object_type is None:
+			self._object_info_cache.clear()
+			self._owners_cache = None
+
+		elif object_type == 'owners':
+			self._owners_cache = None
+
+		else:
+			self._object_info_cache.pop(object_type, None)
+
+	def get_object_info_raw(self, object_type, refresh=False):
+		'''
+		/properties results as returned by the API, without building a
+		DataFrame. Do not mutate them, they are the cached objects.
+
 		Args:
 
 			- object_type (str): Hubspot object type
 
-			- return_as_df (bool): Return as pandas DataFrame
+			- refresh (bool, default=False): Ignore the cached response.
 
 		Returns:
 
-			- df (pd.DataFrame) or dict: Hubspot object info	
+			- results (list): Hubspot object info, one dict per property.
+
+		Notes:
+
+			- Responses are cached per object_type for
+			self.OBJECT_INFO_CACHE_TTL seconds, see self.clear_cache.
 		'''
-		url = f"{self.BASE_URL}/crm/{self.VERSION}/properties/{object_type}"
+		cached = self._object_info_cache.get(object_type)
 
-		headers = {
-			'Authorization': f'Bearer {self.api_key}',
-			'Content-Type': 'application/json',
-		}
+		if (
+			refresh
+			or cached is None
+			or time.monotonic() - cached[0] >= self.OBJECT_INFO_CACHE_TTL
+		):
+			url = f"{self.BASE_URL}/crm/{self.VERSION}/properties/{object_type}"
 
-		response = requests.get(url, headers=headers)
+			response = self.session.get(url)
 
-		if response.status_code != 200:
-			print(response.text)
-			return None
+			if response.status_code != 200:
+				print(response.text)
+				return None
+
+			cached = (time.monotonic(), response.json()['results'])
+			self._object_info_cache[object_type] = cached
 
-		resp = response.json()
+		return cached[1]
+
+	def get_object_info(self, object_type, return_as_df=True, refresh=False):
+		'''
+		Based on self.get_object_info_raw
 
-		df = pd.DataFrame(resp['results'])
+		Args:
+
+			- object_type (str): Hubspot object type
+
+			- return_as_df (bool): Return as pandas DataFrame
+
+			- refresh (bool, default=False): Ignore the cached response.
+
+		Returns:
+
+			- df (pd.DataFrame) or dict: Hubspot object info	
+		'''
+		results = self.get_object_info_raw(object_type, refresh=refresh)
+
+		if results is None:
+			return None
+
+		df = pd.DataFrame(results)
 
 		if return_as_df is False:
 			return df.to_dict(orient='records')
 
 		return df
 
-	def get_object_types(self, object_type, return_as_df=True):
+	def get_object_types(self, object_type, return_as_df=True, refresh=False):
 		'''
-		Based on self.get_object_info
+		Based on self.get_object_info_raw
 
 		Args:
 
@@ -135,20 +253,27 @@ class Hubspot:
 
 			- return_as_df (bool): Return as pandas DataFrame
 
+			- refresh (bool, default=False): Ignore the cached response.
+
 		Returns:
 
 			- df (pd.DataFrame) or dict: Hubspot object types
 		'''
-		df = self.get_object_info(object_type)
+		results = self.get_object_info_raw(object_type, refresh=refresh)
 
-		if df is None:
+		if results is None:
 			return None
 
-		df = df[['name', 'type']]
+		# Only two fields are needed, don't build the full properties frame.
+		df = pd.DataFrame(
+			[(r['name'], r['type']) for r in results],
+			columns=['name', 'type']
+		)
 
 		df['original_type'] = df['type']
 
-		df['type'] = df['type'].apply(lambda x: self.TYPES_MAPPING[x])
+		# Unknown Hubspot types map to NaN and are left alone by map_types.
+		df['type'] = df['type'].map(self.TYPES_MAPPING)
 
 		df = df.set_index('name')
 
@@ -160,16 +285,11 @@ class Hubspot:
 	def get_associations(self, from_object, to_object, ids, return_as_df=True):
 		url = f"{self.BASE_URL}/crm/{self.VERSION}/associations/{from_object}/{to_object}/batch/read"
 
-		headers = {
-			'Authorization': f'Bearer {self.api_key}',
-			'Content-Type': 'application/json',
-		}
-
 		data = {
 			"inputs": ids
 		}
 
-		response = requests.post(url, headers=headers, data=json.dumps(data))
+		response = self.read_session.post(url, data=json.dumps(data))
 
 		if response.status_code not in [200, 207]:
 			print(response.text)
@@ -186,29 +306,31 @@ class Hubspot:
 
 		return pd.DataFrame(resp)
 
-	def get_object_columns(self, object_type):
+	def get_object_columns(self, object_type, refresh=False):
 		'''
-	    Based on self.get_object_info
+	    Based on self.get_object_info_raw
 
 		Args:
 
 			- object_type (str): Hubspot object type
 
+			- refresh (bool, default=False): Ignore the cached response.
+
 		Returns:
 
 			- columns (list): Hubspot object columns
 		'''
 
-		df = self.get_object_info(object_type)
+		results = self.get_object_info_raw(object_type, refresh=refresh)
 
-		if df is None:
+		if results is None:
 			return None
 
-		columns =  df['name'].tolist()
+		columns = [r['name'] for r in results]
 
 		return columns
 
-	def map_types(self, object_type, df):
+	def map_types(self, object_type, df, copy=True):
 		'''
 		Args:
 
@@ -216,35 +338,72 @@ class Hubspot:
 
 			- df (pd.DataFrame): DataFrame to map types
 
+			- copy (bool, default=True): Work on a copy of df. With False
+				the columns of df are replaced in place.
+
 		Returns:
 
 			- df (pd.DataFrame): DataFrame with mapped types
 		'''
-		df = df.copy()
+		if copy:
+			df = df.copy()
 
 		mappings = self.get_object_types(object_type).to_dict()['type']
 
-		for col, dtype in mappings.items():
+		# Walk the frame's columns, not every property of the object: a query
+		# usually selects a handful out of hundreds.
+		for col in df.columns:
 
-			if col in df.columns:
+			dtype = mappings.get(col)
 
-				if dtype in [dict, list]:
-					df[col] = df[col].apply(lambda x: json.dumps(x))
+			if pd.isnull(dtype):
+				continue
+
+			if dtype in [dict, list]:
+				# json.dumps can't be vectorised, but a list comprehension
+				# over the raw array skips Series.apply's per-cell overhead.
+				df[col] = [json.dumps(x) for x in df[col].to_numpy()]
+
+			elif self._has_dtype(df[col], dtype):
+				continue
+
+			else:
+			
+				df[col] = df[col].astype(dtype, errors='ignore')
+
+		# Only object columns can hold these strings. Comparing the raw
+		# array is cheaper than DataFrame.replace's generic matching.
+		obj_columns = df.select_dtypes(include='object').columns
 
-				else:
-				
-					df[col] = df[col].astype(dtype, errors='ignore')
+		if len(obj_columns) > 0:
+			values = df[obj_columns].to_numpy()
+			mask = (values == 'None') | (values == '')
 
-		df.replace(to_replace=['None', ''], value=np.nan, inplace=True)
+			if mask.any():
+				values[mask] = np.nan
+				df[obj_columns] = values
 
 		return df
 
+	@staticmethod
+	def _has_dtype(series, dtype):
+		'''
+		True if series is already of the kind astype(dtype) would produce.
+		str is never skipped: on object columns astype(str) also turns
+		None into 'None', which map_types relies on.
+		'''
+		try:
+			kind = np.dtype(dtype).kind
+
+		except TypeError:
+			return False
+
+		return kind != 'U' and series.dtype.kind == kind
+
 	@staticmethod
 	def date_range(start, end, intv, fmt='%Y/%m/%d'):
 		'''
 		Function to split date range into intervals.
-		This is used to split the start and end date when the total number
-		of records is greater than 10,000.
 
 		Args:
 
@@ -258,63 +417,74 @@ class Hubspot:
 
 		Returns:
 
-			- date_range (iter): Date range iterator
+			- date_range (list): intv + 1 evenly spaced dates, start and end included.
 		'''
 		start = datetime.strptime(start, fmt)
 
 		end = datetime.strptime(end, fmt)
 
-		diff = (end  - start ) / intv
+		# One vectorised linspace + strftime instead of a datetime per split.
+		date_range = pd.date_range(start=start, end=end, periods=intv + 1)
 
-		for i in range(intv):
+		return date_range.strftime('%Y/%m/%dT%H:%M:%S').tolist()
 
-			yield (start + diff * i).strftime('%Y/%m/%dT%H:%M:%S')
+	def get_owners(self, refresh=False):
+		'''
+		Args:
 
-		yield end.strftime('%Y/%m/%dT%H:%M:%S')
+			- refresh (bool, default=False): Ignore the cached listing.
 
-	def get_owners(self):
-		'''
 		Returns:
 
 			- df (pd.DataFrame): Hubspot owners
+
+		Notes:
+
+			- The listing is cached for self.OWNERS_CACHE_TTL seconds,
+			see self.clear_cache.
 		'''
-		url = f"{self.BASE_URL}/crm/{self.VERSION}/owners"
+		cached = self._owners_cache
 
-		headers = {
-			'Authorization': f'Bearer {self.api_key}',
-			'Content-Type': 'application/json',
-		}
+		if (
+			not refresh
+			and cached is not None
+			and time.monotonic() - cached[0] < self.OWNERS_CACHE_TTL
+		):
+			return pd.DataFrame(cached[1])
+
+		url = f"{self.BASE_URL}/crm/{self.VERSION}/owners"
 
 		params = {'limit': 100}
 
 		result_list = []
 
-		response = requests.get(url, headers=headers, params=params)
+		response = self.session.get(url, params=params)
 
 		if response.status_code != 200:
 			print(response.text)
 			return
 
-		results = response.json()['results']
+		body = response.json()
 
-		result_list.extend(results)
+		result_list.extend(body['results'])
 
-		next_page = response.json().get('paging', {}).get('next', {}).get('link')
+		next_page = body.get('paging', {}).get('next', {}).get('link')
 
 		while next_page is not None:
 
-			response = requests.get(next_page, headers=headers)
+			response = self.session.get(next_page)
 
 			if response.status_code != 200:
 				print(response.text)
 				return
 
-			results = response.json()['results']
+			body = response.json()
 
-			result_list.extend(results)
+			result_list.extend(body['results'])
 
-			next_page = response.json().get('paging', {}).get(
-				'next', {}).get('link')
+			next_page = body.get('paging', {}).get('next', {}).get('link')
+
+		self._owners_cache = (time.monotonic(), result_list)
 
 		df = pd.DataFrame(result_list)
 
@@ -350,8 +520,10 @@ class Hubspot:
 
 			- date_fmt (str, default='%Y/%m/%d'): Date format.
 
-			- columns (list, default=None): List of columns to query. If not provided,
-				all columns will be queried.
+			- columns (list | str, default=None): List of columns to query. If not
+				provided or '*', all columns will be queried. Objects often have
+				hundreds of properties, so listing only the needed ones is the
+				main lever on page size and response time.
 
 			- hs_object_id (str | list, default=None): Hubspot object id(s).
 				** All date filtering will be ignored if this is provided.
@@ -368,8 +540,8 @@ class Hubspot:
 			query the last date_window days.
 
 			- When the total number of records is greater than 10,000,
-			a new set is created of length N = total_records / 10,000.
-			The function calls itself N times, allowing for recursion if necessary.
+			the records are swept in hs_object_id order, 10,000 at a time,
+			each sweep starting after the last id of the previous one.
 
 			- If object_type is 'owners', the function will return the owners.
 		
@@ -377,6 +549,49 @@ class Hubspot:
 		if object_type == 'owners':
 			return self.get_owners()
 
+		records = self._query_records(
+			object_type=object_type,
+			date_window=date_window,
+			date_column=date_column,
+			limit=limit,
+			start_date=start_date,
+			end_date=end_date,
+			date_fmt=date_fmt,
+			columns=columns,
+			hs_object_id=hs_object_id,
+			**kwargs
+		)
+
+		if records is None:
+			return None
+
+		df = pd.DataFrame.from_records(list(records.values()))
+
+		# df was built here, no need to protect it from map_types.
+		df = self.map_types(object_type=object_type, df=df, copy=False)
+
+		return df
+
+	def _query_records(
+		self,
+		object_type,
+		date_window,
+		date_column,
+		limit,
+		start_date,
+		end_date,
+		date_fmt,
+		columns,
+		hs_object_id,
+		**kwargs
+		):
+		'''
+		Rows of self.query keyed by id, before any DataFrame is built.
+
+		Returns:
+
+			- records (dict): None if there are no records.
+		'''
 		date_window = date_window or self.DEFAULT_DATE_WINDOW
 
 		if object_type not in self.OBJECTS:
@@ -384,11 +599,6 @@ class Hubspot:
 
 		url = f"{self.BASE_URL}/crm/{self.VERSION}/objects/{object_type}/search"
 
-		headers = {
-			'Authorization': f'Bearer {self.api_key}',
-			'Content-Type': 'application/json',
-		}
-
 		date_column = date_column or self.OBJECTS[object_type]['date_column']
 
 		# Period logic
@@ -418,10 +628,19 @@ class Hubspot:
 
 		end_date_fmt = datetime.fromtimestamp(end_date / 1000).strftime('%Y/%m/%dT%H:%M:%S')
 
+		if not columns or columns == '*':
+			properties = self.get_object_columns(object_type)
+
+		elif isinstance(columns, str):
+			properties = [columns]
+
+		else:
+			properties = columns
+
 		# Payload
 		data = {
 			"filters": [],
-			"properties": columns or self.get_object_columns(object_type),
+			"properties": properties,
 			"sorts": [
 				{
 					"propertyName": date_column,
@@ -467,7 +686,7 @@ class Hubspot:
 		data['limit'] = limit
 		data['archived'] = 'false'
 
-		response = requests.post(url, headers=headers, json=data)
+		response = self.read_session.post(url, json=data)
 
 		if response.status_code != 200:
 			print(response.text)
@@ -487,69 +706,136 @@ class Hubspot:
 		if total == 0:
 			return None
 
-		if total > 10_000:
-			# In this case we create more splits (n) and calls itself n times.
+		# Rows keyed by id: records repeated across pages are kept once (first seen).
+		records = {}
 
-			print('WARNING: The total number of records is greater than 10,000.')
+		def add_rows(rows):
+			for row in rows:
+				records.setdefault(row['id'], row)
 
-			date_range = self.date_range(
-				start_date_fmt,
-				end_date_fmt,
-				int(total / 1000),
-				fmt='%Y/%m/%dT%H:%M:%S',
-			)
-			date_range = list(date_range)
+		if total <= self.MAX_SEARCH_RESULTS:
 
-			print(f"Splitting date range in {int(total / 1000)} batches.")
+			for rows in self._search_pages(url, data, results, total):
+				add_rows(rows)
 
-			df_list = []
+			return records
 
-			for i, v in enumerate(date_range[:-1]):
+		# Past 10,000 results the search API stops paging. Instead of
+		# splitting the dates, sweep in hs_object_id order: each sweep reads
+		# up to 10,000 records and the next one starts after its last id.
+		print('WARNING: The total number of records is greater than 10,000.')
 
-				df = self.query(
-					object_type=object_type,
-					date_column=date_column,
-					start_date=v,
-					end_date=date_range[i + 1],
-					date_fmt='%Y/%m/%dT%H:%M:%S',
-					columns=columns,
-				)
+		print(f"Sweeping {object_type} by hs_object_id.")
 
-				df_list.append(df)
+		sweep = {
+			**data,
+			'sorts': [{'propertyName': 'hs_object_id', 'direction': 'ASCENDING'}],
+		}
 
-			df = pd.concat(df_list)
+		while True:
 
-			return df
+			response = self.read_session.post(url, json=sweep)
 
-		df_list = []
+			if response.status_code != 200:
+				print(response.text)
+				return None
 
-		df_list.extend(results)
+			result = response.json()
 
-		for i in range(len(results), total + 1, len(results)):
-			data['after'] = i
+			last_id = None
 
-			response = requests.post(
-				url,
-				headers=headers,
-				json=data,
+			for rows in self._search_pages(url, sweep, result['results'], result['total']):
+
+				if rows:
+					add_rows(rows)
+					last_id = max(last_id or 0, max(int(row['id']) for row in rows))
+
+			if result['total'] <= self.MAX_SEARCH_RESULTS or last_id is None:
+				break
+
+			sweep['filters'] = data['filters'] + [{
+				'propertyName': 'hs_object_id',
+				'operator': 'GT',
+				'value': last_id,
+			}]
+
+		return records
+
+	def _search_pages(self, url, data, results, total):
+		'''
+		Yields the flattened rows of every page of a search, given its
+		first page, so callers store them directly instead of growing an
+		intermediate list. Pages past self.MAX_SEARCH_RESULTS are not
+		requested.
+
+		Args:
+
+			- url (str): Search url.
+
+			- data (dict): Search payload.
+
+			- results (list): Results of the first page.
+
+			- total (int): Total reported with the first page.
+
+		Yields:
+
+			- rows (list): One page, empty if the request failed.
+		'''
+		yield self._flatten(results)
+
+		# total is known after the first page, so the remaining offsets are
+		# fetched concurrently. Pages are flattened in the worker threads,
+		# while other requests are still in flight. map keeps them in order.
+		afters = range(
+			len(results),
+			min(total, self.MAX_SEARCH_RESULTS),
+			len(results) or data['limit']
+		)
+
+		with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+			pages = executor.map(
+				lambda i: self._flatten(self._search_page(url, data, i)),
+				afters
 			)
 
-			if response.status_code != 200:
-				print(response.text)
-				continue
+			yield from pages
 
-			df_list.extend(response.json()['results'])
-			
-		df = pd.json_normalize(df_list)
+	@staticmethod
+	def _flatten(results):
+		'''
+		Search results as flat rows: properties is already one level deep.
+		'''
+		return [{'id': r['id'], **r['properties']} for r in results]
 
-		df.drop_duplicates(subset=['id'], inplace=True)
+	def _search_page(self, url, data, after):
+		'''
+		One page of a search request.
 
-		df = df[['id'] + [c for c in df.columns if c.startswith('properties.')]]
-		df.columns = [c.replace('properties.', '') for c in df.columns]
+		Returns:
 
-		df = self.map_types(object_type=object_type, df=df)
+			- results (list): Empty if the request failed.
 
-		return df
+		Notes:
+
+			- Runs in worker threads: a connection error is printed and
+			treated like a failed page instead of aborting every other page.
+		'''
+		try:
+			response = self.read_session.post(
+				url,
+				json={**data, 'after': after},
+			)
+
+		except requests.RequestException as e:
+			print(f'Page after={after} failed: {e}')
+			return []
+
+		if response.status_code != 200:
+			print(response.text)
+			return []
+
+		return response.json()['results']
 
 	def upsert_record(
 		self,
@@ -599,12 +885,7 @@ class Hubspot:
 
 		payload = {'properties': kwargs}
 
-		headers = {
-			'Authorization': f'Bearer {self.api_key}',
-			'Content-Type': 'application/json',
-		}
-
-		response = requests.request(method=method, url=url, headers=headers, data=json.dumps(payload))
+		response = self.session.request(method=method, url=url, data=json.dumps(payload))
 
 		if str(response.status_code)[0] != '2':
 			print(response.text)
@@ -633,7 +914,71 @@ class Hubspot:
 		result['association'] = association_result
 
 		return result
-		
+
+	def upsert_records(
+		self,
+		object_type: str,
+		records: list,
+		method: str='create',
+		batch_size: int=100,
+		) -> Union[list, None]:
+		'''
+		Create or update many records through the batch endpoints,
+		batch_size records per request instead of one request per record.
+
+		Args:
+
+			- object_type (str)
+
+			- records (list): Dicts of properties. With method='update'
+				each one must include the 'id' of the record.
+
+			- method (str, default='create'): 'create' or 'update'.
+
+			- batch_size (int, default=100): Records per request, 100 is
+				the maximum Hubspot accepts.
+
+		Returns:
+
+			- results (list): Created or updated records. None if any
+				batch failed, the batches before it are already applied.
+		'''
+		if method not in ['create', 'update']:
+			raise ValueError(f"Invalid method: {method}. It must be 'create' or 'update'.")
+
+		if object_type not in self.OBJECTS:
+			raise ValueError(f'Object type must be one of {self.OBJECTS}')
+
+		url = f"{self.BASE_URL}/crm/{self.VERSION}/objects/{object_type}/batch/{method}"
+
+		if method == 'update':
+			inputs = [
+				{'id': r['id'], 'properties': {k: v for k, v in r.items() if k != 'id'}}
+				for r in records
+			]
+
+		else:
+			inputs = [{'properties': r} for r in records]
+
+		print(f"{method.capitalize()} {len(inputs)} {object_type} in batches of {batch_size}")
+
+		results = []
+
+		for i in range(0, len(inputs), batch_size):
+
+			response = self.session.post(
+				url,
+				data=json.dumps({'inputs': inputs[i:i + batch_size]})
+			)
+
+			if str(response.status_code)[0] != '2':
+				print(response.text)
+				return None
+
+			results.extend(response.json()['results'])
+
+		return results
+
 	def associate_record(
 		self,
 		object_id: str,
@@ -646,12 +991,7 @@ class Hubspot:
 
 		association_url = f"{self.BASE_URL}/crm/{self.VERSION}/objects/{object_type}/{object_id}/associations/{association_object}/{association_id}/{association_type}"
 
-		headers = {
-			'Authorization': f'Bearer {self.api_key}',
-			'Content-Type': 'application/json',
-		}
-
-		association_response = requests.put(association_url, headers=headers)
+		association_response = self.session.put(association_url)
 
 		if association_response.status_code != 200:
 			print(association_response.text)
@@ -1,11 +1,17 @@
+import io
 import time
 import json
+import threading
 from typing import Union, Optional, Dict
 
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
-from bs4 import BeautifulSoup
+import lxml.html
 
 from .scopes import scopes
 from ..utils.functions import sanitize_join_values
@@ -66,22 +72,93 @@ class Outreach:
 		},
 	}
 
+	# Parsed /docs tables keyed by resource: (attributes, relationships).
+	# The docs don't change between calls, so they are shared by every
+	# instance, see get_resource_info.
+	_resource_info_cache = {}
+
+	# Field names keyed by resource, see _resource_fields.
+	_resource_fields_cache = {}
+
+	# The /docs page itself, shared by every resource: (validators, content),
+	# see _get_docs.
+	_docs_cache = None
+
 	def __init__(
 		self,
 		client_id: str,
 		client_secret: str,
 		refresh_token: str=None,
-		redirect_uri: str=None
+		redirect_uri: str=None,
+		max_workers: int=4,
 		):
+		'''
+		Args:
+
+			- client_id (str): Outreach application client id.
+
+			- client_secret (str): Outreach application client secret.
+
+			- refresh_token (str, default=None): Used to get access tokens.
+
+			- redirect_uri (str, default=None): Application redirect uri.
+
+			- max_workers (int, default=4): Concurrent requests when paginating.
+				Outreach rate limits per user, keep it low.
+		'''
 		self.client_id = client_id
 
 		self.client_secret = client_secret
 
 		self.refresh_token = refresh_token
 
+		self.redirect_uri = redirect_uri
+
+		self.max_workers = max_workers
+
+		# One keep-alive connection pool for every call, instead of a new
+		# TLS connection per request. Only idempotent methods are retried,
+		# a POST to create a resource is not replayed.
+		self.session = requests.Session()
+
+		retries = Retry(
+			total=5,
+			backoff_factor=0.2,
+			status_forcelist=[429, 500, 502, 503, 504],
+			raise_on_status=False,
+		)
+		adapter = HTTPAdapter(
+			pool_connections=10,
+			pool_maxsize=max(10, max_workers),
+			max_retries=retries,
+		)
+		self.session.mount('https://', adapter)
+
+		# Serializes refreshes, see self._ensure_token.
+		self._token_lock = threading.Lock()
+
 		self.access_token = None
 
-		self.redirect_uri = redirect_uri
+	@property
+	def access_token(self):
+		return self._access_token
+
+	@access_token.setter
+	def access_token(self, value):
+		'''
+		Kept as the session's default Authorization header, so calls
+		don't rebuild headers and a token set by hand is used as well.
+		A token set by hand never expires, token() sets the real expiry.
+		'''
+		self._access_token = value
+
+		self._token_expiry = float('inf') if value else 0
+
+		if value:
+			self.session.headers['Authorization'] = f'Bearer {value}'
+
+		else:
+			self.session.headers.pop('Authorization', None)
 
 	def authorize(self, scopes: list=None):
 		"""
@@ -112,7 +189,8 @@ class Outreach:
 		cls,
 		resource: str,
 		return_as_df: bool=True,
-		verbose: bool=False
+		verbose: bool=False,
+		refresh: bool=False,
 		):
 		"""
 		Get the information about a resource.
@@ -121,30 +199,47 @@ class Outreach:
 
 			- resource (str): The name of the resource.
 
+			- refresh (bool, default=False): Download the docs again
+				instead of using the cached tables.
+
+		Notes:
+
+			- The parsed tables are cached per resource for the life of
+			the process, upsert_resource calls this on every upsert.
+
 		"""
-		if verbose:
-			print(f"Getting data types about the {resource} resource.")
+		cached = cls._resource_info_cache.get(resource)
 
-		url = f'{cls.API_URL}/docs'
+		if refresh or cached is None:
 
-		response = requests.get(url)
+			if verbose:
+				print(f"Getting data types about the {resource} resource.")
 
-		soup = BeautifulSoup(response.text, 'lxml')
+			content = cls._get_docs(refresh=refresh)
 
-		h3 = soup.find('h3', id=resource)
+			# The docs page is large: parse it once with lxml and hand only the
+			# two tables after the resource's heading to read_html.
+			root = lxml.html.fromstring(content)
 
-		attributes = h3.find_next('table')
-		relationships = attributes.find_next('table')
-		
-		attributes = pd.read_html(str(attributes))[0]
-		relationships = pd.read_html(str(relationships))[0]
+			h3 = root.xpath('//h3[@id=$resource]', resource=resource)[0]
+
+			attributes, relationships = [
+				pd.read_html(io.StringIO(lxml.html.tostring(table, encoding='unicode')))[0]
+				for table in h3.xpath('following::table[position() <= 2]')
+			]
+
+			attributes[['name', 'type']] = attributes['Attribute Name'].str.split(' ', n=1, expand=True)
+			attributes = attributes[['name', 'type']]
+
+			relationships['name'] = relationships['Relationship Name']
+			relationships['type'] = 'string'
+			relationships = relationships[['name', 'type']]
 
-		attributes[['name', 'type']] = attributes['Attribute Name'].str.split(' ', 1, expand=True)
-		attributes = attributes[['name', 'type']]
+			cached = (attributes, relationships)
+			cls._resource_info_cache[resource] = cached
 
-		relationships['name'] = relationships['Relationship Name']
-		relationships['type'] = 'string'
-		relationships = relationships[['name', 'type']]
+		# Callers get their own frames, the cached ones stay untouched.
+		attributes, relationships = (frame.copy() for frame in cached)
 
 		if return_as_df:
 
@@ -197,7 +292,13 @@ class Outreach:
 
 		print(f"Getting an access token with grant type {grant_type}.")
 
-		response = requests.post(url, data=params)
+		# The token endpoint authenticates with the client secret, never
+		# send it the (possibly expired) bearer token.
+		response = self.session.post(
+			url,
+			data=params,
+			headers={'Authorization': None},
+		)
 
 		if response.status_code != 200:
 			print(response.text)
@@ -207,8 +308,39 @@ class Outreach:
 
 		self.access_token = result['access_token']
 
+		# Refresh a little before Outreach expires it.
+		if 'expires_in' in result:
+			self._token_expiry = time.monotonic() + result['expires_in'] - 30
+
 		return result
 
+	def _ensure_token(self, retries: int=10):
+		'''
+		Gets an access token with self.refresh_token unless the current
+		one is still valid. Safe to call from several threads, only one
+		of them refreshes.
+
+		Args:
+
+			- retries (int, default=10): Attempts before giving up.
+		'''
+		if self.access_token and time.monotonic() < self._token_expiry:
+			return
+
+		with self._token_lock:
+
+			for i in range(retries):
+
+				if self.access_token and time.monotonic() < self._token_expiry:
+					return
+
+				if self.token(self.refresh_token) is not None:
+					return
+
+				# Only wait between failed attempts.
+				if i < retries - 1:
+					time.sleep(1)
+
 	@staticmethod
 	def date_range(start, end, intv, fmt='%Y-%m-%d'):
 		'''
@@ -267,11 +399,11 @@ class Outreach:
 			- date_window (int, default=7): The number of days to get the
 				resource for.
 
-			- date_from (str, default=None): The date from which to get
-				the resource. Format is YYYY-MM-DD.
+			- date_from (str | datetime, default=None): The date from which
+				to get the resource. Format is YYYY-MM-DD.
 
-			- date_to (str, default=None): The date to which to get the
-				resource. Format is YYYY-MM-DD.
+			- date_to (str | datetime, default=None): The date to which to
+				get the resource. Format is YYYY-MM-DD.
 
 			- date_variable (str, default='updatedAt'): The variable to
 				use for the date range. Other possible values are
@@ -288,52 +420,47 @@ class Outreach:
 			print(f'Invalid resource: {resource}')
 			return
 
+		# Dates stay datetimes and are formatted once, for the filter.
+		# The date batches below pass datetimes, skipping the parsing.
 		if date_from or date_to:
 
 			if not date_from:
-				date_from = '2000-01-01T00:00:00Z'
+				date_from = datetime(2000, 1, 1)
 
-			else:
-				date_from = datetime.strptime(date_from, date_fmt).strftime('%Y-%m-%dT%H:%M:%SZ')
+			elif not isinstance(date_from, datetime):
+				date_from = datetime.strptime(date_from, date_fmt)
 
 			if not date_to:
-				date_to = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%dT%H:%M:%SZ')
+				date_to = datetime.now() + timedelta(days=1)
 
-			else:
-				date_to = datetime.strptime(date_to, date_fmt).strftime('%Y-%m-%dT%H:%M:%SZ')
+			elif not isinstance(date_to, datetime):
+				date_to = datetime.strptime(date_to, date_fmt)
 
 		else:
 
-			date_from = (datetime.now() - timedelta(days=date_window)).strftime('%Y-%m-%dT%H:%M:%SZ')
+			date_from = datetime.now() - timedelta(days=date_window)
+
+			date_to = datetime.now() + timedelta(days=1)
 
-			date_to = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%dT%H:%M:%SZ')
+		date_from_fmt = date_from.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+		date_to_fmt = date_to.strftime('%Y-%m-%dT%H:%M:%SZ')
 
 		params = {
-			f"filter[{date_variable}]": f"{date_from}..{date_to}",
+			f"filter[{date_variable}]": f"{date_from_fmt}..{date_to_fmt}",
 			"page[limit]": chunk_size,
 		}
 
 		params.update(kwargs)
 
-		# Getting an access token if we don't have one.
-		for _ in range(10):
+		# Getting an access token if we don't have a valid one.
+		self._ensure_token()
 
-			if not self.access_token:
-				self.token(self.refresh_token)
-				time.sleep(1)
-
-			else:
-				break
-
-		print(f"Getting {resource} using {date_variable} from [{date_from}] to [{date_to}].")
+		print(f"Getting {resource} using {date_variable} from [{date_from_fmt}] to [{date_to_fmt}].")
 
 		url = f'{self.API_URL}/{resource}'
 
-		headers = {
-			'Authorization': f'Bearer {self.access_token}',
-		}
-
-		response = requests.get(url, headers=headers, params=params)
+		response = self.session.get(url, params=params)
 
 		if response.status_code != 200:
 			print(response.text)
@@ -348,75 +475,175 @@ class Outreach:
 		if total > 10_000:
 			print('WARNING: The total number of records is greater than 10,000.')
 
-			date_range = self.date_range(
-				date_from,
-				date_to,
-				int(total / 1000),
-				fmt='%Y-%m-%dT%H:%M:%SZ',
-			)
-			date_range = list(date_range)
+			# Evenly spaced datetimes, start and end included.
+			date_range = pd.date_range(
+				start=date_from,
+				end=date_to,
+				periods=int(total / 1000) + 1,
+			).to_pydatetime()
 
 			print(f"Splitting date range in {int(total / 1000)} batches.")
 
-			df_list = []
+			# Batches are independent, so they run concurrently too. Each one
+			# pages with its own pool: up to max_workers ** 2 requests can be
+			# in flight, 429s are retried by the session with backoff.
+			with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+				futures = [
+					executor.submit(
+						self.get_resource,
+						resource=resource,
+						date_window=None,
+						date_from=batch_from,
+						date_to=batch_to,
+						date_variable=date_variable,
+						chunk_size=chunk_size,
+						**kwargs
+					)
+					for batch_from, batch_to in zip(date_range, date_range[1:])
+				]
+
+				# In batch order, so rows come back in date order as before.
+				df_list = [future.result() for future in futures]
+
+			# The batches' own indexes are meaningless once combined.
+			df = pd.concat(df_list, ignore_index=True, copy=False)
 
-			for i, v in enumerate(date_range[:-1]):
+			return df
 
-				df = self.get_resource(
-					resource=resource,
-					date_window=None,
-					date_from=v,
-					date_to=date_range[i + 1],
-					date_fmt='%Y-%m-%dT%H:%M:%SZ',
-					date_variable=date_variable,
-				)
+		# total is known after the first page, so the remaining offsets are
+		# fetched concurrently. Pages are collected in offset order as they
+		# complete; once one fails the result is discarded, so pages not
+		# started yet are cancelled instead of fetched.
+		offsets = range(chunk_size, total, chunk_size)
 
-				df_list.append(df)
+		print(f"Getting {len(offsets)} more pages.")
 
-			df = pd.concat(df_list)
+		# For a DataFrame, records are flattened as their page arrives, in
+		# the worker threads, instead of by json_normalize at the end.
+		flatten = return_as_dataframe
 
-			return df
+		# Pages are appended to the first page's list in place.
+		data = result['data']
 
-		for i in range(1, total // 50 + 1):
+		if flatten:
+			data = [self._flatten(r) for r in data]
 
-			print(f"Getting page {i + 1} of {total // 50 + 1}.", end='\r')
+		# Filters and limit are the same for every page: encode them once,
+		# pages only append their offset.
+		page_url = f'{url}?{urlencode(params, doseq=True)}&page%5Boffset%5D='
 
-			params['page[offset]'] = i * 50
+		with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+			futures = [
+				executor.submit(self._get_page, f'{page_url}{o}', flatten)
+				for o in offsets
+			]
 
-			response = requests.get(url, headers=headers, params=params)
+			for future in futures:
+				page = future.result()
 
-			if response.status_code != 200:
-				print(response.text)
-				return
+				if page is None:
+					for f in futures:
+						f.cancel()
 
-			result['data'] += response.json()['data']
+					return
+
+				data.extend(page)
 
 		if return_as_dataframe:
-			result = pd.json_normalize(result['data'])
+			result = pd.DataFrame(data)
 
-			# replace periods
-			result.columns = [c.replace('.', '_') for c in result.columns]
+			# Each group is converted as one frame and written back in a
+			# single assignment, instead of one column insert at a time.
 
 			# Datetimes
 			datetime_columns = [c for c in result.columns if c.endswith('At')]
 
-			for c in datetime_columns:
-				result[c] = pd.to_datetime(
-					result[c],
-					format='%Y-%m-%dT%H:%M:%S.000Z',
+			if datetime_columns:
+				# %f takes any fraction, a single non-zero millisecond used to
+				# fail the literal .000 and leave the whole column as strings.
+				# 'Z' stays literal so the result is naive UTC, as before.
+				result[datetime_columns] = result[datetime_columns].apply(
+					pd.to_datetime,
+					format='%Y-%m-%dT%H:%M:%S.%fZ',
 					errors='ignore',
-			)
+					cache=True,
+				)
 
 			# Ids
 			id_columns = [
 				c for c in result.columns if c.endswith('Id') or c.lower() == 'id'
 			]
 
-			for c in id_columns:
-				result[c] = sanitize_join_values(result[c])
+			# Object columns are sanitized value by value, so they go through
+			# as one flat array instead of one call per column. Numeric
+			# columns already take sanitize_join_values' vectorised path.
+			object_ids = [c for c in id_columns if result[c].dtype == object]
+
+			other_ids = [c for c in id_columns if c not in object_ids]
+
+			if object_ids:
+				values = result[object_ids].to_numpy(dtype=object)
+
+				flat = sanitize_join_values(values.ravel(), return_as_list=False)
+
+				result[object_ids] = flat.to_numpy(dtype=object).reshape(values.shape)
+
+			if other_ids:
+				result[other_ids] = result[other_ids].apply(
+					sanitize_join_values,
+					return_as_list=False,
+				)
 
 		return result
 
+	def _get_page(self, url, flatten=False):
+		'''
+		One page of a resource listing.
+
+		Args:
+
+			- url (str): Page url, query string included.
+
+			- flatten (bool, default=False): Return the records flattened,
+				see self._flatten.
+
+		Returns:
+
+			- data (list): None if the request failed.
+		'''
+		response = self.session.get(url)
+
+		if response.status_code != 200:
+			print(response.text)
+			return
+
+		data = response.json()['data']
+
+		if flatten:
+			data = [self._flatten(r) for r in data]
+
+		return data
+
+	@classmethod
+	def _flatten(cls, record, prefix=''):
+		'''
+		Flattens nested dicts the way pd.json_normalize does, joining keys
+		with '_' (periods in keys become '_' too). Lists are kept as is.
+		'''
+		flat = {}
+
+		for k, v in record.items():
+
+			key = prefix + str(k).replace('.', '_')
+
+			if isinstance(v, dict):
+				flat.update(cls._flatten(v, key + '_'))
+
+			else:
+				flat[key] = v
+
+		return flat
+
 	def upsert_resource(self, resource, verbose=False, **kwargs):
 		'''
 		Updates or inserts a resource.
@@ -436,39 +663,35 @@ class Outreach:
 			- if 'id' is in the kwargs, then the resource will be updated.
 		'''
 		# Obtaining the resource information
-		fields = self.get_resource_info(
-			self.RESOURCES[resource]['singular'])[['name']]
-
-		fields[['name_first', 'name_last']] = fields['name'].str.split(
-			'_', expand=True)
+		fields = self._resource_fields(self.RESOURCES[resource]['singular'])
 
 		# Combining the data with the resource information
 		data = {}
 
-		for f in fields['name_first'].unique():
+		for f, names in fields.items():
 
 			data[f] = {}
 
-			for _, v in fields[fields['name_first'] == f].iterrows():
+			for name in names:
 				
-				value = kwargs.get(v['name_last'].lower()) or kwargs.get(v['name_last'])
+				value = kwargs.get(name.lower()) or kwargs.get(name)
 
-				type_ = kwargs.get(f'{v["name_last"].lower()}_type') or kwargs.get(f'{v["name_last"]}_type')
+				type_ = kwargs.get(f'{name.lower()}_type') or kwargs.get(f'{name}_type')
 
 				if value:
 
 					if f == 'relationships':
 
-						data[f][v['name_last']] = {
+						data[f][name] = {
 							'data': {
 								'id': value,
-								'type': type_ or v['name_last'],
+								'type': type_ or name,
 							}
 						}
 
 					else:
 
-						data[f][v['name_last']] = value
+						data[f][name] = value
 
 		data = {"data": data}
 		data['data']['type'] = self.RESOURCES[resource]['singular']
@@ -486,22 +709,11 @@ class Outreach:
 
 			data['data']['id'] = kwargs['id']
 
-		# Getting an access token if we don't have one.
-		for _ in range(10):
-
-			if not self.access_token:
-				self.token(self.refresh_token)
-				time.sleep(1)
-
-			else:
-				break
+		# Getting an access token if we don't have a valid one.
+		self._ensure_token()
 
 		# Calling the Api
-		headers = {
-			'Authorization': f'Bearer {self.access_token}',
-		}
-
-		response = requests.request(method, url, headers=headers, json=data)
+		response = self.session.request(method, url, json=data)
 
 		if str(response.status_code)[0] != '2':
 			print(response.text)
@@ -511,24 +723,97 @@ class Outreach:
 
 		return result
 
-	def request(self, resource: str, method: str = 'POST', data: Optional[Dict] = None) -> Union[Dict, None]:
-		url = f'{self.API_URL}/{resource}'
+	@classmethod
+	def _get_docs(cls, refresh: bool=False) -> bytes:
+		'''
+		Body of the /docs page, which documents every resource.
 
-		for _ in range(10):
-			if not self.access_token:
-				self.token(self.refresh_token)
-				time.sleep(1)
-			else:
-				break
+		Args:
+
+			- refresh (bool, default=False): Revalidate the cached page. It
+				is sent with its ETag/Last-Modified, so an unchanged page
+				answers 304 and is not downloaded again.
+
+		Returns:
+
+			- content (bytes)
+
+		Raises:
+
+			- requests.HTTPError: The page could not be fetched. The cache
+				is left as it was.
+		'''
+		cached = cls._docs_cache
+
+		if cached is not None and not refresh:
+			return cached[1]
+
+		headers = cached[0] if cached is not None else {}
+
+		response = requests.get(f'{cls.API_URL}/docs', headers=headers)
+
+		if response.status_code == 304:
+			return cached[1]
+
+		# Error pages are never cached, they would be parsed as the docs by
+		# every instance.
+		if response.status_code != 200:
+			raise requests.HTTPError(
+				f'Could not get {cls.API_URL}/docs: {response.status_code}',
+				response=response,
+			)
+
+		validators = {}
+
+		if 'ETag' in response.headers:
+			validators['If-None-Match'] = response.headers['ETag']
+
+		if 'Last-Modified' in response.headers:
+			validators['If-Modified-Since'] = response.headers['Last-Modified']
 
-		headers = {'Authorization': f'Bearer {self.access_token}'}
+		cls._docs_cache = (validators, response.content)
 
-		payload = dict(method=method, url=url, headers=headers)
+		return response.content
+
+	@classmethod
+	def _resource_fields(cls, resource: str) -> Dict[str, list]:
+		'''
+		Attribute and relationship names of a resource as plain lists,
+		computed once per resource so upserts skip the DataFrame work.
+
+		Args:
+
+			- resource (str): The singular name of the resource.
+
+		Returns:
+
+			- fields (dict): {'attributes': [...], 'relationships': [...]}
+		'''
+		fields = cls._resource_fields_cache.get(resource)
+
+		if fields is None:
+			info = cls.get_resource_info(resource, return_as_df=False)
+
+			fields = {
+				'attributes': [f['name'] for f in info['attributes']],
+				'relationships': [f['name'] for f in info['relationships']],
+			}
+
+			cls._resource_fields_cache[resource] = fields
+
+		return fields
+
+	def request(self, resource: str, method: str = 'POST', data: Optional[Dict] = None) -> Union[Dict, None]:
+		url = f'{self.API_URL}/{resource}'
 
-		if data is not None and method != 'GET':
-			payload['json'] = data
+		self._ensure_token()
 
-		response = requests.request(**payload)
+		# The bearer token is already on the session headers.
+		response = self.session.request(
+			method,
+			url,
+			json=data if method != 'GET' else None,
+		)
 
 		if response.status_code == 204:
 			return
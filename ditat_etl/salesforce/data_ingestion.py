@@ -1,6 +1,8 @@
 from typing import List
+from concurrent.futures import ThreadPoolExecutor
 
 import pandas as pd
+import numpy as np
 
 from .main import SalesforceObj
 from ..utils.entity_resolution import Matcher
@@ -15,6 +17,8 @@ class DataLoader:
 
 	def __init__(self, config):
 		self.loaded_compare_data = False
+		self.compare_data_from_sf = False
+		self.matched_accounts = None
 
 		self.sf = SalesforceObj(**config)
 
@@ -50,6 +54,12 @@ class DataLoader:
 		entity_name='Name'
 	):
 		print('Starting to load account compare data')
+
+		# Only data fresh from Salesforce can stand in for current values,
+		# see self.changed_accounts.
+		self.compare_data_from_sf = data is None
+		self.matched_accounts = None
+
 		# If a dataframe is not provided, we load it from Salesforce.
 		if data is None:
 			data = self.sf.query_parallel(
@@ -66,6 +76,11 @@ class DataLoader:
 				n_chunks=5
 			)
 
+			# Few distinct countries across the whole Account table, and the
+			# frame is held twice (here and in the Matcher).
+			if country and country in data.columns:
+				data[country] = data[country].astype('category')
+
 		self.matcher.set_df(
 			data=data,
 			name=name,
@@ -94,22 +109,27 @@ class DataLoader:
 				f'{sobject} is not an allowed Salesforce object. Choose one of {self.ALLOWED_SOBJECTS}'
 			)
 
-		if type(path_or_dataframe) == pd.DataFrame:
+		if isinstance(path_or_dataframe, pd.DataFrame):
 			data = path_or_dataframe
 
 		else:
 			data = pd.read_csv(filepath_or_buffer=path_or_dataframe)
 
-		data = data.copy()
+		# No copy of data up front: nothing below modifies it in place and
+		# map_types works on its own copy.
 
 		# When sobject != 'Account', format joiner column and exclude for
 		# map types
 		joiner = False
-		if sobject_join_column in data.columns and sobject != 'Account':
+		if (
+			sobject != 'Account'
+			and sobject_join_column is not None
+			and sobject_join_column in data.columns
+		):
 
-			joiner_series = data[sobject_join_column]
+			joiner_series = data[sobject_join_column].copy()
 
-			data.drop(columns=[sobject_join_column], inplace=True)
+			data = data.drop(columns=[sobject_join_column])
 
 			setattr(self, f"{sobject}_join_column", f"{sobject_join_column}_join_column")
 
@@ -163,6 +183,51 @@ class DataLoader:
 
 		return resp
 
+	def changed_accounts(self, accounts, update_diff_on=None):
+		'''
+		Accounts that differ from the compare data on update_diff_on, using
+		the same test as SalesforceObj.upsert_df. Unchanged accounts are
+		dropped here, without asking Salesforce for its current records.
+
+		Args:
+			- accounts (pd.DataFrame): Accounts with their Id.
+
+			- update_diff_on (List(str), default=None): Columns to compare.
+
+		Returns:
+			- accounts (pd.DataFrame): All of them when the comparison can't
+				be done locally: no update_diff_on, compare data not loaded
+				from Salesforce or keyed by another index, or missing columns.
+		'''
+		if (
+			not update_diff_on
+			or not self.loaded_compare_data
+			or not self.compare_data_from_sf
+			or self.compare_index != 'Id'
+			or any(c not in self.compare_data.columns for c in update_diff_on)
+			or any(c not in accounts.columns for c in update_diff_on)
+		):
+			return accounts
+
+		current = self.compare_data.drop_duplicates(subset=['Id']).set_index('Id')
+		current = current[update_diff_on].reindex(accounts['Id'])
+
+		changed = np.zeros(len(accounts), dtype=bool)
+
+		for c in update_diff_on:
+			new = accounts[c]
+			old = pd.Series(current[c].to_numpy(), index=accounts.index)
+
+			changed |= (
+				(new.astype(str) != old.astype(str))
+				& new.notnull()
+				& (new != '')
+			).to_numpy()
+
+		print(f'Accounts differing on {update_diff_on}: {changed.sum()} of {len(accounts)}')
+
+		return accounts[changed]
+
 	def main(
 		self,
 		account_conflict_on: str='Name',
@@ -217,87 +282,156 @@ class DataLoader:
 		ac = self.Account.columns
 
 		if account_conflict_on != 'Id':
-			# Matcher part 2
-			self.matcher.set_df(
-				data=self.Account.drop_duplicates(subset=[account_conflict_on]),
-				name='new',
-				index=account_conflict_on,
-				domain='Website' if 'Website' in ac else None,
-				address='BillingStreet' if 'BillingStreet' in ac else None,
-				phone='Phone' if 'Phone' in ac else None,
-				country='BillingCountry' if 'BillingCountry' in ac else None,
-				entity_name='Name' if 'Name' in ac else None
-			)
+			fields = {
+				'domain': 'Website' if 'Website' in ac else None,
+				'address': 'BillingStreet' if 'BillingStreet' in ac else None,
+				'phone': 'Phone' if 'Phone' in ac else None,
+				'country': 'BillingCountry' if 'BillingCountry' in ac else None,
+				'entity_name': 'Name' if 'Name' in ac else None,
+			}
+
+			# Matching is the slow part. It is reused only when every column
+			# it reads has the same values (one hash per row) and the compare
+			# data was not reloaded since; the Matcher keeps its own copy.
+			matched_columns = list(dict.fromkeys(
+				[account_conflict_on] + [c for c in fields.values() if c]
+			))
+			row_hashes = pd.util.hash_pandas_object(
+				self.Account[matched_columns], index=False
+			).to_numpy()
+
+			key = (account_conflict_on, tuple(matched_columns))
+
+			cached = self.matched_accounts
+
+			if (
+				cached is not None
+				and cached['key'] == key
+				and cached['compare_data'] is self.compare_data
+				and np.array_equal(cached['row_hashes'], row_hashes)
+			):
+				print('Reusing account matches from the previous run')
+
+				matches_mapping = cached['matches_mapping']
+
+			else:
+				# Matcher part 2
+				self.matcher.set_df(
+					data=self.Account.drop_duplicates(subset=[account_conflict_on]),
+					name='new',
+					index=account_conflict_on,
+					**fields
+				)
+
+				matches = self.matcher.run(
+					match_type_included = [   
+						['domain'],
+						['domain', 'entity_name'],
+						['domain', 'address'],
+						['domain', 'phone'],
+						['entity_name', 'address'],
+						['entity_name', 'phone'],
+
+						['entity_name'],
+					]
+				)
+				key_new = f"{account_conflict_on}_new"
+				idx_compare = f"{self.compare_index}_compare"
+
+				# First match per new account, matched ids are never null.
+				matches_mapping = matches[[key_new, idx_compare]].drop_duplicates(
+					subset=[key_new]
+				).set_index(key_new)[idx_compare]
+
+				self.matched_accounts = {
+					'key': key,
+					'compare_data': self.compare_data,
+					'row_hashes': row_hashes,
+					'matches_mapping': matches_mapping,
+				}
 
-			matches = self.matcher.run(
-				match_type_included = [   
-					['domain'],
-					['domain', 'entity_name'],
-					['domain', 'address'],
-					['domain', 'phone'],
-					['entity_name', 'address'],
-					['entity_name', 'phone'],
-
-					['entity_name'],
-				]
-			)
-			matches_mapping = matches[[
-				f"{account_conflict_on}_new", f"{self.compare_index}_compare"
-			]].groupby(f"{account_conflict_on}_new").first()[
-				f"{self.compare_index}_compare"
-			]
-			
 			# Obtaining AccountId for existing accounts
 			self.Account['Id'] = self.Account[account_conflict_on].map(matches_mapping)
 
-		existing_accounts = self.Account[self.Account['Id'].notnull()]
-		existing_accounts.drop_duplicates(subset=['Id'], inplace=True)
+		has_id = self.Account['Id'].notnull().to_numpy()
 
-		new_accounts = self.Account[self.Account['Id'].isnull()]
-		new_accounts.drop_duplicates(subset=[account_conflict_on], inplace=True)
-		new_accounts.drop(columns=['Id'], inplace=True, axis=1)
+		existing_accounts = self.Account.loc[has_id].drop_duplicates(subset=['Id'])
+
+		new_accounts = self.Account.loc[~has_id].drop_duplicates(
+			subset=[account_conflict_on]
+		).drop(columns=['Id'])
 
 		print(f'Existing accounts: {len(existing_accounts)}')
 		print(f'New accounts: {len(new_accounts)}')
 
-		# Account Creation
-		new_accountid_mapping = None
+		# New and existing accounts don't depend on each other, so the insert
+		# and the update run side by side.
+		accounts_to_update = None
 
-		if create_accounts and len(new_accounts) > 0:
-			new_accounts_resp = self.to_sf(
-				tablename='Account',
-				dataframe=new_accounts,
-				update=False,
-				insert=True,
-				conflict_on=account_conflict_on,
-				return_response=True,
-				overwrite=False,
-				overwrite_columns=None,
-				verbose=verbose
+		if update_accounts and len(existing_accounts) > 0:
+			accounts_to_update = self.changed_accounts(
+				existing_accounts,
+				update_only_missing_on
 			)
 
-			new_accountid_mapping =  pd.DataFrame(new_accounts_resp.get('insert', {}).get('result', []))
-			new_accountid_mapping = new_accountid_mapping[list(set(['id'] + [account_conflict_on]))]
+			if len(accounts_to_update) == 0:
+				print(f'No existing accounts differ on {update_only_missing_on}.')
+
+		new_accounts_future = None
+		existing_accounts_future = None
+
+		with ThreadPoolExecutor(max_workers=2) as executor:
+			# Account Creation
+			if create_accounts and len(new_accounts) > 0:
+				new_accounts_future = executor.submit(
+					self.to_sf,
+					tablename='Account',
+					dataframe=new_accounts,
+					update=False,
+					insert=True,
+					conflict_on=account_conflict_on,
+					return_response=True,
+					overwrite=False,
+					overwrite_columns=None,
+					verbose=verbose
+				)
 
-		# Account Update
-		existing_accountid_mapping = None
+			# Account Update
+			if accounts_to_update is not None and len(accounts_to_update) > 0:
+				existing_accounts_future = executor.submit(
+					self.to_sf,
+					tablename='Account',
+					dataframe=accounts_to_update,
+					update=True,
+					insert=False,
+					conflict_on='Id',
+					return_response=True,
+					overwrite=True if account_overwrite_columns else False,
+					overwrite_columns=account_overwrite_columns,
+					verbose=verbose,
+					update_diff_on=update_only_missing_on,
+				)
 
-		if update_accounts and len(existing_accounts) > 0:
-			existing_accounts_resp = self.to_sf(
-				tablename='Account',
-				dataframe=existing_accounts,
-				update=True,
-				insert=False,
-				conflict_on='Id',
-				return_response=True,
-				overwrite=True if account_overwrite_columns else False,
-				overwrite_columns=account_overwrite_columns,
-				verbose=verbose,
-				update_diff_on=update_only_missing_on,
+		new_accountid_mapping = None
+
+		if new_accounts_future is not None:
+			new_accounts_resp = new_accounts_future.result()
+
+			new_accountid_mapping = pd.DataFrame.from_records(
+				new_accounts_resp.get('insert', {}).get('result', []),
+				columns=list(set(['id'] + [account_conflict_on]))
 			)
 
-			resp_ids = existing_accounts_resp.get('update', {}).get('result', [])
-			resp_ids = [r.get('id') for r in resp_ids]
+		existing_accountid_mapping = None
+
+		if accounts_to_update is not None:
+			resp_ids = []
+
+			if existing_accounts_future is not None:
+				existing_accounts_resp = existing_accounts_future.result()
+
+				resp_ids = existing_accounts_resp.get('update', {}).get('result', [])
+				resp_ids = [r.get('id') for r in resp_ids]
 
 			filtered_existing_accounts = existing_accounts[list(set(['Id'] + [account_conflict_on]))]
 			filtered_existing_accounts = filtered_existing_accounts[
@@ -305,10 +439,15 @@ class DataLoader:
 			]
 			filtered_existing_accounts = filtered_existing_accounts.rename(columns={'Id': 'id'})
 
-			existing_accountid_mapping = filtered_existing_accounts.copy()
+			existing_accountid_mapping = filtered_existing_accounts
 
 		# Account Id Mapping
-		accountid_mapping = pd.concat([existing_accountid_mapping, new_accountid_mapping], axis=0)
+		accountid_mapping = pd.concat(
+			[existing_accountid_mapping, new_accountid_mapping],
+			axis=0,
+			ignore_index=True,
+			copy=False
+		)
 
 		if account_conflict_on != 'Id':
 			accountid_mapping = accountid_mapping[['id'] +  [account_conflict_on]]
@@ -3,7 +3,7 @@ from functools import wraps, update_wrapper
 
 
 class TimeIt:
-	def __init__(self, func=None, decimals=4, text=None):
+	def __init__(self, func=None, decimals=4, text=None, verbose_arg=None):
 		'''
 		Utility class to time:
 			1. Callables
@@ -13,6 +13,9 @@ class TimeIt:
 			- func (callable, default=None)
 			- decimals (int, default=4)
 			- text(str, default=None): Use text for indented block
+			- verbose_arg (str, default=None): Name of a keyword argument of
+				the decorated callable. If given, timing is only measured and
+				printed when that argument is passed as a truthy keyword.
 
 		Examples:
 
@@ -50,12 +53,23 @@ class TimeIt:
 
 				>> m takes: 0.0 sec.
 
+			E)
+				@TimeIt(verbose_arg='verbose')
+				def f(verbose=False):
+					pass
+
+				f() # Nothing printed.
+				f(verbose=True)
+
+				>> f takes: 0.0 sec.
+
 		'''
 		update_wrapper(self, func)
 
 		self.func = func
 		self.decimals = decimals
 		self.block_text = text or 'indented block'
+		self.verbose_arg = verbose_arg
 
 	def __call__(self, func=None, *args, **kwargs):
 		# When decorating without callable
@@ -79,6 +93,9 @@ class TimeIt:
 		else:
 			@wraps(func)
 			def wrapper(*args, **kwargs):
+				if self.verbose_arg and not kwargs.get(self.verbose_arg):
+					return func(*args, **kwargs)
+
 				start = time.time()
 
 				result = func(*args, **kwargs)
@@ -21,7 +21,7 @@ def extract_domain(
 	isemail=False
 
 ):
-	url_or_email = url_or_email if type(url_or_email) == str else str(url_or_email)
+	url_or_email = url_or_email if isinstance(url_or_email, str) else str(url_or_email)
 
 	result = None
 
@@ -81,12 +81,17 @@ class Matcher:
 		Note:
 			- Since the matching might either have One to One relationship
 				or Many to One relationship, you have to set the dataframe with Many first.
-		'''
-		if self._counter > 2:
-			raise ValidationError('You have already set both dataframes.')
 
+			- Setting an existing name again replaces that dataframe.
+		'''
 		if name in self._names:
-			raise ValueError('Name already taken!')
+			position = self._names.index(name) + 1
+
+		elif self._counter > 2:
+			raise ValueError('You have already set both dataframes.')
+
+		else:
+			position = self._counter
 
 		frame = Frame(
 			data=data,
@@ -99,10 +104,11 @@ class Matcher:
 			entity_name=entity_name
 		)
 
-		setattr(self, f"frame__{self._counter}", frame)
-		
-		self._counter += 1
-		self._names.append(name)
+		setattr(self, f"frame__{position}", frame)
+
+		if name not in self._names:
+			self._counter += 1
+			self._names.append(name)
 
 	def dedupe(
 		self,
@@ -371,6 +377,8 @@ class Matcher:
 		match_type_included = [i for i in match_type_included if i not in match_type_excluded]
 
 		# Run individual matches according to attribute in self.features_candidates and concatenate.
+		self.features_processed = []
+
 		for feature in self.features_candidates:
 			setattr(
 				self, f"{feature}_matches",
@@ -58,7 +58,12 @@ def sanitize_join_values(values, null_type=None, return_as_list=True):
 		return str(x)
 
 	if t == 'object':
-		values = values.apply(f)
+		# Comprehension over the array, Series.apply adds per-cell overhead.
+		values = pd.Series(
+			[f(x) for x in values.to_numpy()],
+			index=values.index,
+			dtype=object,
+		)
 
 	elif values.dtype in ['int64', 'float64']:
 		values = values.astype('Int64').astype(str)
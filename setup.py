@@ -42,7 +42,7 @@ setup(
         'simple-salesforce',
         'spacy',
 		'slackclient',
-		'bs4',
+		'lxml',
 	]
 
 )